@@ -17,7 +17,7 @@ from datetime import datetime
 
 from docker_wrapper_agent import DockerfileAgent
 from file_handler import FileReader
-from security import validate_file_path, check_file_size, detect_prompt_injection
+from security import validate_file_path, stat_file_path, check_file_size, detect_prompt_injection
 
 
 def save_dockerfile(dockerfile_content: str, script_path: str) -> str:
@@ -78,12 +78,17 @@ Examples:
         default='openai',
         help='LLM provider to use (default: openai)'
     )
+    parser.add_argument(
+        '--prepull',
+        action='store_true',
+        help='Pull common base images in the background before the first build'
+    )
 
     args = parser.parse_args()
 
     # Validate files with security checks
     try:
-        script_path = validate_file_path(args.script_path)
+        script_path, script_stat = stat_file_path(args.script_path)
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -95,7 +100,7 @@ Examples:
         sys.exit(1)
 
     # Check file size
-    is_valid, size = check_file_size(script_path, max_size_bytes=500 * 1024)
+    is_valid, size = check_file_size(script_path, max_size_bytes=500 * 1024, stat_result=script_stat)
     if not is_valid:
         print(f"Error: Script too large ({size} bytes). Maximum: 500KB")
         sys.exit(1)
@@ -103,20 +108,20 @@ Examples:
     # Load script with FileReader
     print(f"Reading script: {script_path}")
     try:
-        file_reader = FileReader(script_path, threshold=100 * 1024)  # 100KB threshold
+        file_reader = FileReader.from_stat(script_path, script_stat, threshold=100 * 1024)  # 100KB threshold
         print(f"✓ Script loaded ({file_reader.size} bytes, {file_reader.line_count} lines)")
         file_size_str = "LARGE" if file_reader.is_large else "SMALL"
         print(f"  File type: {file_size_str}")
 
-        # Check for prompt injection in script content (if small enough to check)
-        if not file_reader.is_large:
-            try:
-                with open(script_path, 'r') as f:
-                    script_content = f.read()
-                if detect_prompt_injection(script_content):
-                    print(f"⚠️  Warning: Script contains potential prompt injection patterns")
-            except Exception:
-                pass  # Silently skip if detection fails
+        # Check for prompt injection in script content whenever it is held in
+        # memory, i.e. the file is under the byte threshold; files large only
+        # by line count are checked too
+        try:
+            content_text = file_reader.content_text
+            if content_text is not None and detect_prompt_injection(content_text):
+                print(f"⚠️  Warning: Script contains potential prompt injection patterns")
+        except Exception:
+            pass  # Silently skip if detection fails
     except Exception as e:
         print(f"✗ Error loading script: {e}")
         sys.exit(1)
@@ -128,9 +133,11 @@ Examples:
         sys.exit(1)
     print(f"✓ Example usage file found")
 
-    # Check for prompt injection in example usage file
+    # Check for prompt injection in example usage file; the content read here
+    # is handed to the agent so the file isn't read twice
+    example_content = None
     try:
-        with open(example_usage_file, 'r') as f:
+        with open(example_usage_file, 'r', encoding='utf-8') as f:
             example_content = f.read()
         if detect_prompt_injection(example_content):
             print(f"⚠️  Warning: Example file contains potential prompt injection patterns")
@@ -169,6 +176,7 @@ Examples:
     print(f"Agent mode: {agent_type}")
     print(f"Agent will: generate → test (via tools) → iterate\n")
 
+    agent = None
     try:
         agent = DockerfileAgent(
             provider=args.provider,
@@ -176,6 +184,8 @@ Examples:
             file_reader=file_reader,
             script_path=script_path,
             example_usage_file=example_usage_file,
+            prepull_images=args.prepull,
+            example_content=example_content,
         )
         result = agent.generate()
 
@@ -207,6 +217,10 @@ Examples:
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        # Remove the images built across test iterations in one batch
+        if agent is not None:
+            agent.cleanup()
 
 
 if __name__ == "__main__":
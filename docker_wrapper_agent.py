@@ -1,15 +1,27 @@
 """Dockerfile generation agent with conditional tool registration."""
 
 import os
-import tempfile
+import asyncio
 import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Optional
 from pydantic_ai import Agent, RunContext
 from pydantic import BaseModel
 
 from config import validate_provider, set_api_key
 from file_handler import FileReader
-from docker_ops import test_dockerfile as run_test_dockerfile, check_docker_available
+from docker_ops import (
+    test_dockerfile as run_test_dockerfile,
+    test_dockerfile_async as run_test_dockerfile_async,
+    check_docker_available,
+    prepull_base_images,
+    prune_images_if_needed,
+    reap_pulls,
+    remove_images,
+    TestResult,
+    _unique_name,
+)
 from prompts import build_file_metadata, build_content_section, build_system_prompt, clean_markdown
 from logging_config import configure_logging
 
@@ -17,6 +29,12 @@ from logging_config import configure_logging
 configure_logging()
 logger = logging.getLogger(__name__)
 
+# Separator line for the log banners
+_SEP = "=" * 70
+
+# Concurrent candidate builds; bounded so the Docker daemon isn't thrashed
+MAX_CONCURRENT_BUILDS = max(1, (os.cpu_count() or 2) // 2)
+
 
 class DockerfileOutput(BaseModel):
     """Output from Dockerfile generation."""
@@ -25,6 +43,229 @@ class DockerfileOutput(BaseModel):
     reasoning: Optional[str] = None
 
 
+@dataclass
+class AgentDeps:
+    """Per-run state handed to the shared Agent's tools through RunContext."""
+    script_path: str
+    file_reader: FileReader
+    # Last successfully built test image; the next build reuses its layers.
+    # Every build gets its own tag, since pydantic_ai may run several
+    # test_dockerfile calls from one model response at the same time.
+    cache_image: Optional[str] = None
+    # Images left in place during the run and removed in cleanup()
+    dirty_images: list[str] = field(default_factory=list)
+
+
+async def _test_candidates(
+    deps: AgentDeps,
+    dockerfile_contents: list[str],
+    example_input: str,
+    example_output: str,
+) -> tuple[Optional[int], list[TestResult]]:
+    """
+    Test several Dockerfiles concurrently.
+
+    Builds reuse the layers of deps.cache_image, which is updated as builds
+    succeed, like the test_dockerfile tool does.
+
+    Args:
+        deps: Per-run state; candidate images are recorded in deps.dirty_images
+        dockerfile_contents: Candidate Dockerfiles
+        example_input: Input to run each container with
+        example_output: Expected output
+
+    Returns:
+        Tuple of (index of the first passing candidate or None, results in candidate order)
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BUILDS)
+    script_bytes = deps.file_reader.content_bytes
+
+    async def run_one(dockerfile_content: str) -> TestResult:
+        image_name = _unique_name("test")
+        deps.dirty_images.append(image_name)
+        async with semaphore:
+            result = await run_test_dockerfile_async(
+                dockerfile_content=dockerfile_content,
+                script_path=deps.script_path,
+                example_input=example_input,
+                expected_output=example_output,
+                script_bytes=script_bytes,
+                image_name=image_name,
+                cache_from=deps.cache_image,
+            )
+        if not result.build_errors:
+            deps.cache_image = image_name
+        return result
+
+    results = await asyncio.gather(*(run_one(c) for c in dockerfile_contents))
+    # Images are removed in one batch at the end; only prune under disk pressure
+    await asyncio.to_thread(prune_images_if_needed)
+    passed = next((i for i, r in enumerate(results) if r.success), None)
+    return passed, list(results)
+
+
+def _register_tools(agent: Agent, use_search_tool: bool, docker_available: bool) -> None:
+    """Register tools based on configuration; per-run state comes from ctx.deps."""
+
+    # Always register test_dockerfile if Docker is available
+    if docker_available:
+        @agent.tool
+        def test_dockerfile(
+            ctx: RunContext[AgentDeps],
+            dockerfile_content: str,
+            example_input: str,
+            example_output: str,
+        ) -> dict:
+            """Test a generated Dockerfile by building and running it."""
+            logger.info(_SEP)
+            logger.info("🔧 TOOL CALLED: test_dockerfile")
+            logger.info(_SEP)
+            logger.info("  Input: %.100s", example_input)
+            logger.info("  Expected Output: %.100s", example_output)
+            logger.info("  Dockerfile length: %d chars", len(dockerfile_content))
+
+            logger.info("  Building Docker image...")
+            deps = ctx.deps
+            image_name = _unique_name("test")
+            deps.dirty_images.append(image_name)
+            result = run_test_dockerfile(
+                dockerfile_content=dockerfile_content,
+                script_path=deps.script_path,
+                example_input=example_input,
+                expected_output=example_output,
+                image_name=image_name,
+                cache_from=deps.cache_image,
+                script_bytes=deps.file_reader.content_bytes,
+            )
+            if not result.build_errors:
+                deps.cache_image = image_name
+            # Same disk-pressure policy as test_dockerfile_candidates
+            prune_images_if_needed()
+
+            logger.info("  Build result: %s", "✓ SUCCESS" if result.success else "✗ FAILED")
+            if result.build_errors:
+                logger.info("  Build errors: %.200s", result.build_errors)
+            if result.runtime_errors:
+                logger.info("  Runtime errors: %.200s", result.runtime_errors)
+            logger.info(_SEP)
+
+            return {
+                "success": result.success,
+                "build_errors": result.build_errors,
+                "runtime_errors": result.runtime_errors,
+                "output_diff": result.output_diff,
+                "actual_output": result.actual_output,
+            }
+
+        @agent.tool
+        async def test_dockerfile_candidates(
+            ctx: RunContext[AgentDeps],
+            dockerfile_contents: list[str],
+            example_input: str,
+            example_output: str,
+        ) -> dict:
+            """Test several alternative Dockerfiles concurrently and report the first that passes."""
+            logger.info(_SEP)
+            logger.info("🔧 TOOL CALLED: test_dockerfile_candidates")
+            logger.info(_SEP)
+            logger.info("  Candidates: %d", len(dockerfile_contents))
+
+            passed, results = await _test_candidates(
+                ctx.deps, dockerfile_contents, example_input, example_output
+            )
+
+            logger.info("  Passing candidate: %s", passed if passed is not None else "none")
+            logger.info(_SEP)
+
+            return {
+                "passed_index": passed,
+                "results": [
+                    {
+                        "success": r.success,
+                        "build_errors": r.build_errors,
+                        "runtime_errors": r.runtime_errors,
+                        "output_diff": r.output_diff,
+                        "actual_output": r.actual_output,
+                    }
+                    for r in results
+                ],
+            }
+
+    # Conditionally register search_in_file for large files
+    if use_search_tool:
+        @agent.tool
+        def search_in_file(
+            ctx: RunContext[AgentDeps],
+            pattern: str,
+            context_lines: int = 2,
+        ) -> list[dict]:
+            """Search for patterns in the script file without loading full content."""
+            logger.info(_SEP)
+            logger.info("🔍 TOOL CALLED: search_in_file")
+            logger.info(_SEP)
+            logger.info("  Pattern: %s", pattern)
+            logger.info("  Context lines: %d", context_lines)
+
+            results = ctx.deps.file_reader.search_in_file(pattern, context_lines)
+
+            logger.info("  Results: Found %d matches", len(results))
+            for i, result in enumerate(results[:3], 1):  # Show first 3
+                logger.info("    %d. Line %d: %.60s", i, result["line_num"], result["content"])
+            if len(results) > 3:
+                logger.info("    ... and %d more matches", len(results) - 3)
+            logger.info(_SEP)
+
+            return results
+
+        @agent.tool
+        def search_in_file_batch(
+            ctx: RunContext[AgentDeps],
+            patterns: list[str],
+            context_lines: int = 2,
+        ) -> dict[str, list[dict]]:
+            """Search for several patterns in one pass over the script file; returns matches per pattern."""
+            logger.info(_SEP)
+            logger.info("🔍 TOOL CALLED: search_in_file_batch")
+            logger.info(_SEP)
+            logger.info("  Patterns: %s", patterns)
+            logger.info("  Context lines: %d", context_lines)
+
+            results = ctx.deps.file_reader.search_in_file_batch(patterns, context_lines)
+
+            for pattern, matches in results.items():
+                logger.info("  %s: %d matches", pattern, len(matches))
+            logger.info(_SEP)
+
+            return results
+
+
+@lru_cache(maxsize=None)
+def get_agent(model: str, use_search_tool: bool, docker_available: bool, api_key: str) -> Agent:
+    """
+    Return the Agent for a configuration, creating and caching it on first use.
+
+    The system prompt and tool schemas depend only on these flags, so every
+    DockerfileAgent with the same configuration shares one Agent. The API key
+    is part of the key because the model client picks it up when created.
+
+    Args:
+        model: Model identifier from validate_provider
+        use_search_tool: Register the search tools (large files)
+        docker_available: Register the Docker test tools
+        api_key: API key the model client was created with
+
+    Returns:
+        Configured Agent taking AgentDeps
+    """
+    agent = Agent(
+        model=model,
+        deps_type=AgentDeps,
+        system_prompt=build_system_prompt(use_search_tool, docker_available),
+    )
+    _register_tools(agent, use_search_tool, docker_available)
+    return agent
+
+
 class DockerfileAgent:
     """
     Dockerfile generation agent with conditional tool registration.
@@ -44,6 +285,8 @@ class DockerfileAgent:
         file_reader: FileReader,
         script_path: str,
         example_usage_file: str,
+        prepull_images: bool = False,
+        example_content: Optional[str] = None,
     ):
         """
         Initialize agent with conditional tool registration.
@@ -54,111 +297,81 @@ class DockerfileAgent:
             file_reader: FileReader instance
             script_path: Path to the script
             example_usage_file: Path to file containing example input and expected output
+            prepull_images: Pull common base images in the background before the first build
+            example_content: Already-read content of example_usage_file (read here if None)
         """
         self.file_reader = file_reader
         self.script_path = script_path
         self.example_usage_file = example_usage_file
 
+        if example_content is None:
+            with open(example_usage_file, 'r', encoding='utf-8') as f:
+                example_content = f.read()
+        self.example_content = example_content
+
         # Use search tool for large files
         self.use_search_tool = file_reader.is_large
 
         # Check if Docker is available
         self.docker_available = check_docker_available()
+        self._pulls = prepull_base_images() if self.docker_available and prepull_images else []
+
+        self.deps = AgentDeps(
+            script_path=script_path,
+            file_reader=file_reader,
+        )
 
         model = validate_provider(provider)
         set_api_key(provider, api_key)
 
-        system_prompt = build_system_prompt(self.use_search_tool, self.docker_available)
+        # The user prompt opens with file metadata and (for small files) the
+        # full script; render that once rather than on every generate()
+        file_metadata = build_file_metadata(self.file_reader, self.script_path)
+        content_section = build_content_section(self.file_reader, self.use_search_tool)
+        self._prompt_prefix = f"{file_metadata}\n\n{content_section}\n\n"
 
-        self.agent = Agent(
-            model=model,
-            system_prompt=system_prompt,
-        )
+        self.agent = get_agent(model, self.use_search_tool, self.docker_available, api_key)
 
         # Set max iterations to prevent infinite loops
         self.max_iterations = 5
 
-        # Register tools conditionally
-        self._register_tools()
-
-    def _register_tools(self) -> None:
-        """Register tools based on configuration."""
-
-        # Always register test_dockerfile if Docker is available
-        if check_docker_available():
-            @self.agent.tool
-            def test_dockerfile(
-                ctx: RunContext[None],
-                dockerfile_content: str,
-                example_input: str,
-                example_output: str,
-            ) -> dict:
-                """Test a generated Dockerfile by building and running it."""
-                logger.info("=" * 70)
-                logger.info("🔧 TOOL CALLED: test_dockerfile")
-                logger.info("=" * 70)
-                logger.info(f"  Input: {example_input[:100]}")
-                logger.info(f"  Expected Output: {example_output[:100]}")
-                logger.info(f"  Dockerfile length: {len(dockerfile_content)} chars")
-
-                with tempfile.NamedTemporaryFile(mode='w', suffix='Dockerfile', delete=False) as f:
-                    f.write(dockerfile_content)
-                    dockerfile_path = f.name
-
-                try:
-                    logger.info(f"  Building Docker image...")
-                    result = run_test_dockerfile(
-                        dockerfile_path=dockerfile_path,
-                        script_path=self.script_path,
-                        example_input=example_input,
-                        expected_output=example_output,
-                    )
-
-                    logger.info(f"  Build result: {'✓ SUCCESS' if result.success else '✗ FAILED'}")
-                    if result.build_errors:
-                        logger.info(f"  Build errors: {result.build_errors[:200]}")
-                    if result.runtime_errors:
-                        logger.info(f"  Runtime errors: {result.runtime_errors[:200]}")
-                    logger.info("=" * 70)
-
-                    return {
-                        "success": result.success,
-                        "build_errors": result.build_errors,
-                        "runtime_errors": result.runtime_errors,
-                        "output_diff": result.output_diff,
-                        "actual_output": result.actual_output,
-                    }
-                finally:
-                    try:
-                        os.unlink(dockerfile_path)
-                    except Exception:
-                        pass
+    def cleanup(self) -> None:
+        """Reap background pulls and remove every image built during the run with a single `docker rmi`."""
+        reap_pulls(self._pulls)
+        self._pulls = []
+        if self.deps.dirty_images:
+            remove_images(self.deps.dirty_images)
+        self.deps.dirty_images = []
+        self.deps.cache_image = None
 
-        # Conditionally register search_in_file for large files
-        if self.use_search_tool:
-            @self.agent.tool
-            def search_in_file(
-                ctx: RunContext[None],
-                pattern: str,
-                context_lines: int = 2,
-            ) -> list[dict]:
-                """Search for patterns in the script file without loading full content."""
-                logger.info("=" * 70)
-                logger.info("🔍 TOOL CALLED: search_in_file")
-                logger.info("=" * 70)
-                logger.info(f"  Pattern: {pattern}")
-                logger.info(f"  Context lines: {context_lines}")
-
-                results = self.file_reader.search_in_file(pattern, context_lines)
-
-                logger.info(f"  Results: Found {len(results)} matches")
-                for i, result in enumerate(results[:3], 1):  # Show first 3
-                    logger.info(f"    {i}. Line {result['line_num']}: {result['content'][:60]}")
-                if len(results) > 3:
-                    logger.info(f"    ... and {len(results) - 3} more matches")
-                logger.info("=" * 70)
-
-                return results
+    def close(self) -> None:
+        """Release Docker resources; same as cleanup()."""
+        self.cleanup()
+
+    def __enter__(self) -> "DockerfileAgent":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    async def test_candidates(
+        self,
+        dockerfile_contents: list[str],
+        example_input: str,
+        example_output: str,
+    ) -> tuple[Optional[int], list[TestResult]]:
+        """
+        Test several Dockerfiles concurrently.
+
+        Args:
+            dockerfile_contents: Candidate Dockerfiles
+            example_input: Input to run each container with
+            example_output: Expected output
+
+        Returns:
+            Tuple of (index of the first passing candidate or None, results in candidate order)
+        """
+        return await _test_candidates(self.deps, dockerfile_contents, example_input, example_output)
 
     def generate(self) -> DockerfileOutput:
         """
@@ -172,52 +385,37 @@ class DockerfileAgent:
         Returns:
             DockerfileOutput with generated Dockerfile
         """
-        logger.info("=" * 70)
+        logger.info(_SEP)
         logger.info("🚀 STARTING DOCKERFILE GENERATION")
-        logger.info("=" * 70)
-        logger.info(f"  Script: {self.script_path}")
-        logger.info(f"  File size: {self.file_reader.size / 1024:.1f}KB")
-        logger.info(f"  File type: {'LARGE (uses search_in_file)' if self.use_search_tool else 'SMALL (full content)'}")
-        logger.info(f"  Docker available: {self.docker_available}")
-
-        # Read example file content for the prompt
-        with open(self.example_usage_file, 'r', encoding='utf-8') as f:
-            example_content = f.read()
-
-        file_metadata = build_file_metadata(self.file_reader, self.script_path)
-        content_section = build_content_section(self.file_reader, self.use_search_tool)
+        logger.info(_SEP)
+        logger.info("  Script: %s", self.script_path)
+        logger.info("  File size: %.1fKB", self.file_reader.size / 1024)
+        logger.info("  File type: %s", "LARGE (uses search_in_file)" if self.use_search_tool else "SMALL (full content)")
+        logger.info("  Docker available: %s", self.docker_available)
 
         if self.use_search_tool:
             # Large file prompt with search guidance
-            prompt = f"""{file_metadata}
-
-{content_section}
-
-Search for:
-1. All imports/dependencies (search for: ^import |^from |^require|package\\.json|requirements\\.txt|Gemfile|Cargo\\.toml)
-2. System packages needed (search for: apt-get|apk|brew|yum)
-3. Entry point/main function (search for: ^if __name__|def main|function main|^func main)
+            prompt = f"""{self._prompt_prefix}Search for the following with a single search_in_file_batch call, passing all three patterns:
+1. All imports/dependencies (pattern: ^import |^from |^require|package\\.json|requirements\\.txt|Gemfile|Cargo\\.toml)
+2. System packages needed (pattern: apt-get|apk|brew|yum)
+3. Entry point/main function (pattern: ^if __name__|def main|function main|^func main)
 
 Example usage:
-{example_content}
+{self.example_content}
 
 Generate a Dockerfile that allows running this script with the same command-line interface.
 Search for dependencies first, then generate. Test using the test_dockerfile tool and iterate if needed."""
         else:
             # Small file prompt with full content
-            prompt = f"""{file_metadata}
-
-{content_section}
-
-Example usage:
-{example_content}
+            prompt = f"""{self._prompt_prefix}Example usage:
+{self.example_content}
 
 Generate a Dockerfile that allows running this script with the same command-line interface.
 Test it using the test_dockerfile tool and iterate if needed."""
 
         try:
-            logger.info(f"  Calling agent with prompt...")
-            result = self.agent.run_sync(prompt)
+            logger.info("  Calling agent with prompt...")
+            result = self.agent.run_sync(prompt, deps=self.deps)
 
             # Extract content
             if hasattr(result, "output"):
@@ -229,11 +427,11 @@ Test it using the test_dockerfile tool and iterate if needed."""
 
             dockerfile_content = clean_markdown(dockerfile_content)
 
-            logger.info("=" * 70)
+            logger.info(_SEP)
             logger.info("✓ GENERATION COMPLETE")
-            logger.info("=" * 70)
-            logger.info(f"  Dockerfile lines: {len(dockerfile_content.splitlines())}")
-            logger.info(f"  Dockerfile size: {len(dockerfile_content)} chars")
+            logger.info(_SEP)
+            logger.info("  Dockerfile lines: %d", len(dockerfile_content.splitlines()))
+            logger.info("  Dockerfile size: %d chars", len(dockerfile_content))
 
             # Add note if Docker testing was not available
             reasoning = None
@@ -243,18 +441,18 @@ Test it using the test_dockerfile tool and iterate if needed."""
 
             # Check if we hit max iterations
             # Note: This would be returned in result if available
-            logger.info("=" * 70)
+            logger.info(_SEP)
             return DockerfileOutput(
                 dockerfile=dockerfile_content.strip(),
                 success=True,
                 reasoning=reasoning,
             )
         except Exception as e:
-            logger.error("=" * 70)
+            logger.error(_SEP)
             logger.error("✗ GENERATION FAILED")
-            logger.error("=" * 70)
-            logger.error(f"  Error: {str(e)}")
-            logger.error("=" * 70)
+            logger.error(_SEP)
+            logger.error("  Error: %s", e)
+            logger.error(_SEP)
             return DockerfileOutput(
                 dockerfile="",
                 success=False,
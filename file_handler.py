@@ -1,8 +1,136 @@
 """File handling with smart reading for large files."""
 
+import mmap
+import os
 import re
+from collections import deque
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+# Slice/read size when counting newlines, over a memory map or plain reads
+_COUNT_CHUNK = 1024 * 1024
+
+# Bytes read per block when searching a file
+_SEARCH_BLOCK = 64 * 1024
+
+# Bytes read per block once the match limit is hit and only the context
+# after the last matches is still needed
+_TAIL_BLOCK = 4 * 1024
+
+# Constructs whose result can change when a line is matched inside a larger
+# block (string anchors, negative lookarounds, $ after a consumed newline);
+# patterns using them are matched line by line instead
+_LINE_ONLY_RE = re.compile(r"\\[AZB]|\(\?<?!|\$")
+
+# Group references; joining patterns into one alternation renumbers their
+# groups, so these would point at the wrong group in the combined regex
+_GROUP_REF_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(\d")
+
+# Lookarounds can look past the line a block-level match lies in, so such a
+# match doesn't prove the line matches on its own
+_LOOKAROUND_RE = re.compile(r"\(\?<?[=!]")
+
+
+@lru_cache(maxsize=128)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a regex, reusing the compiled pattern for repeated searches."""
+    return re.compile(pattern, flags)
+
+
+@lru_cache(maxsize=128)
+def _required_literal(pattern: str) -> Optional[str]:
+    """
+    Longest run of plain characters that every match of pattern must contain.
+
+    Only the top level of the pattern is inspected; anchors don't break a run
+    since they match no characters. Returns None for case-insensitive
+    patterns or when there is no such run.
+    """
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+
+    best, run = "", []
+    for op, arg in parsed:
+        if op is _sre_parse.LITERAL:
+            run.append(chr(arg))
+        elif op is not _sre_parse.AT:
+            run = []
+        if len(run) > len(best):
+            best = "".join(run)
+    return best or None
+
+
+def _decode_block(data: bytes) -> str:
+    """Decode a block of the file with universal newlines."""
+    return data.decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _count_lines(data: bytes) -> int:
+    """Count lines in raw bytes as a text-mode read would split them (LF, CRLF or CR)."""
+    newlines = data.count(b"\n")
+    if b"\r" in data:
+        newlines += data.count(b"\r") - data.count(b"\r\n")
+    # A final line without a line ending still counts
+    return newlines + (1 if data and data[-1:] not in (b"\n", b"\r") else 0)
+
+
+def _split_lines(text: str) -> tuple[list[str], bool]:
+    """Split decoded text into lines without newlines, and tell whether the last one ended in one."""
+    lines = text.split("\n") if text else []
+    terminated = text.endswith("\n")
+    if terminated:
+        lines.pop()
+    return lines, terminated
+
+
+def _matching_lines(
+    regex, text: str, lines: list[str], terminated: bool, per_line: bool, lookaround: bool = True
+):
+    """
+    Yield indices of lines in a block that the regex matches on their own.
+
+    Each line is tested as it would be from readlines(), i.e. with its
+    trailing newline. Unless per_line is set, the regex is first run over the
+    whole block and only lines where a block-level match starts are tested.
+    A match that lies within its line already proves the line matches, so
+    that line is only tested again when it may not: the match runs on into
+    the next line, or lookaround is set and the regex may have looked there.
+    """
+    def line_text(idx: int) -> str:
+        return lines[idx] + "\n" if terminated or idx < len(lines) - 1 else lines[idx]
+
+    if per_line:
+        for idx in range(len(lines)):
+            if regex.search(line_text(idx)):
+                yield idx
+        return
+
+    pos = 0  # Start of line idx in text
+    idx = 0
+    while pos < len(text):
+        m = regex.search(text, pos)
+        if not m:
+            return
+        idx += text.count("\n", pos, m.start())
+        line_end = text.find("\n", m.start())
+        within_line = line_end < 0 or m.end() <= line_end + 1
+        if (within_line and not lookaround) or regex.search(line_text(idx)):
+            yield idx
+        # Resume at the next line so a match spanning lines can't hide one
+        pos = line_end + 1
+        if pos == 0:
+            return
+        idx += 1
 
 
 class FileReader:
@@ -11,44 +139,203 @@ class FileReader:
     # Size threshold: files larger than this use search tool
     DEFAULT_THRESHOLD = 100 * 1024  # 100KB
 
-    def __init__(self, file_path: str, threshold: int = DEFAULT_THRESHOLD):
+    # Line threshold: per-line search and prompt cost grow with line count,
+    # so files with more lines than this use the search tool as well
+    DEFAULT_THRESHOLD_LINES = 5000
+
+    def __init__(
+        self,
+        file_path: str,
+        threshold: int = DEFAULT_THRESHOLD,
+        stat_result: Optional[os.stat_result] = None,
+        threshold_lines: int = DEFAULT_THRESHOLD_LINES,
+    ):
         """
         Initialize FileReader.
 
         Args:
             file_path: Path to file
             threshold: Size threshold in bytes (files larger use search tool)
+            stat_result: Stat result already fetched for file_path (skips another stat)
+            threshold_lines: Line threshold (files with more lines use search tool)
         """
         self.file_path = file_path
         self.threshold = threshold
-        self.content: Optional[str] = None
+        self.threshold_lines = threshold_lines
+        self._stat = stat_result
         self.size = 0
-        self.is_large = False
-        self.line_count = 0
+        self._line_count: Optional[int] = None
+        self._lines: Optional[tuple[str, list[str], bool]] = None
 
         self._initialize()
 
+    @classmethod
+    def from_stat(cls, file_path: str, stat_result: os.stat_result, **kwargs) -> "FileReader":
+        """
+        Create a FileReader from a stat result already fetched for file_path.
+
+        Args:
+            file_path: Path to file
+            stat_result: Stat result, e.g. from security.validate_batch or
+                security.validate_directory
+            **kwargs: Passed on to FileReader (threshold, threshold_lines)
+
+        Returns:
+            FileReader that does not stat the file again
+        """
+        return cls(file_path, stat_result=stat_result, **kwargs)
+
+    @classmethod
+    def from_direntry(cls, entry: os.DirEntry, **kwargs) -> "FileReader":
+        """
+        Create a FileReader from an os.scandir entry, using its cached stat result.
+
+        Args:
+            entry: Directory entry for the file
+            **kwargs: Passed on to FileReader (threshold, threshold_lines)
+
+        Returns:
+            FileReader for entry.path
+        """
+        return cls.from_stat(entry.path, entry.stat(), **kwargs)
+
     def _initialize(self):
-        """Initialize file: detect if large/small and load content for small files."""
-        path = Path(self.file_path)
-        self.size = path.stat().st_size
-        self.is_large = self.size > self.threshold
+        """Initialize file: stat it once; content is only read when first needed."""
+        if self._stat is None:
+            self._stat = Path(self.file_path).stat()
+        self.size = self._stat.st_size
 
-        # For small files, load content immediately
-        if not self.is_large:
-            try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self.content = f.read()
-                    self.line_count = len(self.content.splitlines())
-            except Exception as e:
-                raise IOError(f"Failed to read file {self.file_path}: {e}")
-        else:
-            # For large files, count lines without loading full content
+    @cached_property
+    def _bytes(self) -> Optional[bytes]:
+        """
+        Raw bytes of a file small in bytes, read on first use and kept.
+
+        Kept so the Docker build context and injection checks don't re-read
+        the file. None for files over the byte threshold, which are never
+        read as a whole.
+        """
+        if self.size > self.threshold:
+            return None
+        try:
+            return Path(self.file_path).read_bytes()
+        except Exception as e:
+            raise IOError(f"Failed to read file {self.file_path}: {e}")
+
+    @cached_property
+    def _text(self) -> Optional[str]:
+        """Decoded text of a file small in bytes, decoded on first use; None for large files."""
+        data = self._bytes
+        if data is None:
+            return None
+        try:
+            # One decode of the whole buffer; line endings are normalized
+            # as a text-mode read would, but only when there is a CR at all
+            content = data.decode("utf-8")
+        except Exception as e:
+            raise IOError(f"Failed to read file {self.file_path}: {e}")
+        if b"\r" in data:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        return content
+
+    @property
+    def is_large(self) -> bool:
+        """Whether the file is over the byte or line threshold and must be searched."""
+        return self.size > self.threshold or self.line_count > self.threshold_lines
+
+    @property
+    def content(self) -> Optional[str]:
+        """Decoded file content, or None for large files."""
+        if self.is_large:
+            return None
+        return self._text
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counted from the raw bytes on first access."""
+        if self._line_count is None and self._bytes is not None:
+            self._line_count = _count_lines(self._bytes)
+        if self._line_count is None:
+            # Count newline bytes over a memory map in one C-level scan, or
+            # over 1MB reads where the file can't be mapped
             try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self.line_count = sum(1 for _ in f)
+                try:
+                    self._line_count = self._count_lines_mmap()
+                except (OSError, ValueError):
+                    self._line_count = self._count_lines_buffered()
             except Exception as e:
                 raise IOError(f"Failed to count lines in {self.file_path}: {e}")
+        return self._line_count
+
+    def _count_lines_mmap(self) -> int:
+        """Count lines by scanning the memory-mapped file for newline bytes."""
+        if self.size == 0:
+            return 0  # mmap can't map an empty file
+        with open(self.file_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                newlines = sum(
+                    mm[i : i + _COUNT_CHUNK].count(b"\n")
+                    for i in range(0, len(mm), _COUNT_CHUNK)
+                )
+                # A final line without a trailing newline still counts
+                return newlines + (0 if mm[-1:] == b"\n" else 1)
+
+    def _count_lines_buffered(self) -> int:
+        """Count lines by reading the file in _COUNT_CHUNK blocks of raw bytes."""
+        newlines = 0
+        last = b""
+        with open(self.file_path, "rb") as f:
+            while True:
+                buf = f.read(_COUNT_CHUNK)
+                if not buf:
+                    break
+                newlines += buf.count(b"\n")
+                last = buf[-1:]
+        # A final line without a trailing newline still counts
+        return newlines + (0 if last in (b"", b"\n") else 1)
+
+    @property
+    def content_bytes(self) -> bytes:
+        """Raw file bytes; cached for small files, read on demand for large ones."""
+        if self._bytes is not None:
+            return self._bytes
+        return Path(self.file_path).read_bytes()
+
+    @property
+    def content_view(self) -> memoryview:
+        """
+        Read-only view of the raw file bytes.
+
+        For small files this wraps the cached bytes without copying them, so
+        consumers that only scan or slice the content need no decoded str or
+        extra buffer; large files are read on demand like content_bytes.
+        """
+        return memoryview(self.content_bytes)
+
+    @property
+    def content_text(self) -> Optional[str]:
+        """
+        Decoded file content for any file small in bytes, else None.
+
+        Unlike content, this is also set for files that are large only by
+        line count, since their bytes are held in memory anyway.
+        """
+        return self._text
+
+    def _text_lines(self) -> tuple[str, list[str], bool]:
+        """
+        Decoded text, its lines and whether the last line ends in a newline.
+
+        For files held in memory this is computed once and shared by every
+        search; large files are read and split on each call.
+        """
+        if self._lines is not None:
+            return self._lines
+        if self._bytes is None:
+            text = _decode_block(self.content_bytes)
+            return (text, *_split_lines(text))
+        text = self._text
+        self._lines = (text, *_split_lines(text))
+        return self._lines
 
     def get_content(self) -> str:
         """
@@ -71,48 +358,246 @@ class FileReader:
         """
         Search for regex pattern in file without loading full content.
 
+        The file is read in line-aligned blocks and the regex runs over each
+        whole block; only lines where it matches are looked at individually.
+
+        Args:
+            pattern: Regex pattern to search for
+            context_lines: Number of context lines to include
+
+        Returns:
+            List of matches with context (at most 50)
+        """
+        return list(self.search_in_file_iter(pattern, context_lines, max_matches=50))
+
+    def search_in_file_iter(
+        self, pattern: str, context_lines: int = 2, max_matches: Optional[int] = None
+    ) -> Iterator[dict]:
+        """
+        Search like search_in_file, yielding matches as the file is read.
+
+        Each match is yielded once its context_after lines have been read, so
+        only matches still waiting for context are held in memory.
+
         Args:
             pattern: Regex pattern to search for
             context_lines: Number of context lines to include
+            max_matches: Stop after this many matches (no limit if None)
+
+        Returns:
+            Iterator over matches with context
+
+        Raises:
+            ValueError: If pattern is not a valid regex (raised immediately)
+        """
+        try:
+            regex = _compile(pattern, re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f"Invalid regex pattern: {e}")
+        per_line = bool(_LINE_ONLY_RE.search(pattern))
+        lookaround = bool(_LOOKAROUND_RE.search(pattern))
+        # Blocks without this text can't contain a match, so the regex is skipped
+        literal = _required_literal(pattern)
+        return self._search_blocks(regex, per_line, lookaround, literal, context_lines, max_matches)
+
+    def _search_blocks(self, regex, per_line, lookaround, literal, context_lines, max_matches):
+        """Generator behind search_in_file_iter."""
+        try:
+            queue = deque()  # Matches not yet yielded, in file order
+            found = 0
+            before = deque(maxlen=context_lines)  # Last lines of earlier blocks
+            line_base = 0  # Lines in earlier blocks
+
+            blocks = self._iter_blocks()
+            block = next(blocks, None)
+            while block is not None:
+                text, lines, terminated = block
+
+                for match in queue:
+                    match["context_after"].extend(
+                        lines[: context_lines - len(match["context_after"])]
+                    )
+
+                limit_hit = max_matches is not None and found >= max_matches
+                if not limit_hit and (literal is None or literal in text):
+                    for idx in _matching_lines(regex, text, lines, terminated, per_line, lookaround):
+                        if context_lines:
+                            context_before = lines[max(0, idx - context_lines) : idx]
+                            if len(context_before) < context_lines:
+                                missing = context_lines - len(context_before)
+                                context_before = list(before)[-missing:] + context_before
+                        else:
+                            context_before = []
+                        queue.append({
+                            "line_num": line_base + idx + 1,
+                            "content": lines[idx],
+                            "context_before": context_before,
+                            "context_after": lines[idx + 1 : idx + 1 + context_lines],
+                        })
+                        found += 1
+
+                        # Limit results to prevent overwhelming output
+                        if max_matches is not None and found >= max_matches:
+                            limit_hit = True
+                            break
+
+                # Matches are complete, in order, once their context is read
+                while queue and len(queue[0]["context_after"]) >= context_lines:
+                    yield queue.popleft()
+
+                if limit_hit and not queue:
+                    return
+                line_base += len(lines)
+                before.extend(lines[-context_lines:] if context_lines else ())
+
+                # Past the match limit only a few context lines are missing,
+                # so read small blocks rather than another full one
+                try:
+                    block = blocks.send(_TAIL_BLOCK if limit_hit else None)
+                except StopIteration:
+                    break
+
+            # End of file: the remaining matches have all the context there is
+            yield from queue
+
+        except Exception as e:
+            raise IOError(f"Error searching file: {e}")
+
+    def _iter_blocks(self):
+        """
+        Yield the file as line-aligned blocks of about _SEARCH_BLOCK bytes.
+
+        Each block is a (text, lines, terminated) tuple as from _text_lines.
+        Every block but possibly the last ends with a newline; line endings are
+        normalized to LF as in a text-mode read. Sending a byte count into the
+        generator changes the size of the following blocks.
+
+        A file already held in memory is one block, split only once per
+        reader. Otherwise the file is memory-mapped so blocks are sliced
+        straight from the page cache, and only pages the search reaches are
+        ever read.
+        """
+        if self._bytes is not None:
+            yield self._text_lines()
+            return
+        with open(self.file_path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Empty or unmappable file
+                yield from self._iter_read_blocks(f)
+                return
+            with mm:
+                size = _SEARCH_BLOCK
+                pos = 0
+                end_of_file = len(mm)
+                while pos < end_of_file:
+                    end = pos + size
+                    if end < end_of_file:
+                        # End the block after its last newline, or after the
+                        # first one past it when a line is longer than a block
+                        last = mm.rfind(b"\n", pos, end)
+                        if last < 0:
+                            last = mm.find(b"\n", end)
+                        end = last + 1 if last >= 0 else end_of_file
+                    else:
+                        end = end_of_file
+                    text = _decode_block(mm[pos:end])
+                    requested = yield (text, *_split_lines(text))
+                    pos = end
+                    if requested:
+                        size = requested
+
+    @staticmethod
+    def _iter_read_blocks(f):
+        """Yield line-aligned blocks like _iter_blocks using plain reads."""
+        size = _SEARCH_BLOCK
+        carry = b""
+        while True:
+            # Grow the read with the carry so a very long line isn't
+            # assembled from many small reads
+            chunk = f.read(max(size, len(carry)))
+            if not chunk:
+                break
+            buf = carry + chunk
+            last = buf.rfind(b"\n")
+            if last < 0:
+                carry = buf
+                continue
+            carry = buf[last + 1 :]
+            text = _decode_block(buf[: last + 1])
+            requested = yield (text, *_split_lines(text))
+            if requested:
+                size = requested
+        if carry:
+            text = _decode_block(carry)
+            yield (text, *_split_lines(text))
+
+    def search_in_file_batch(
+        self, patterns: list[str], context_lines: int = 2
+    ) -> dict[str, list[dict]]:
+        """
+        Search for several regex patterns in a single pass over the file.
+
+        The file is decoded and split into lines once (and kept for files
+        held in memory). Lines are screened with
+        one combined regex run over the whole text; only lines that match it
+        are checked against each pattern individually, and context is sliced
+        from the already split lines.
+
+        Args:
+            patterns: Regex patterns to search for
+            context_lines: Number of context lines to include
 
         Returns:
-            List of matches with context
+            Dict mapping each pattern to its matches (same format as search_in_file)
         """
-        matches = []
         max_matches = 50
 
         try:
-            regex = re.compile(pattern, re.MULTILINE)
+            regexes = [_compile(p, re.MULTILINE) for p in patterns]
         except re.error as e:
             raise ValueError(f"Invalid regex pattern: {e}")
+        if any(_GROUP_REF_RE.search(p) for p in patterns):
+            combined = None
+        else:
+            try:
+                combined = _compile("|".join(f"(?:{p})" for p in patterns), re.MULTILINE)
+            except re.error:
+                # e.g. the same group name in two patterns; screen with nothing
+                combined = None
+        per_line = any(_LINE_ONLY_RE.search(p) for p in patterns)
+        literals = [_required_literal(p) for p in patterns]
 
+        results: dict[str, list[dict]] = {p: [] for p in patterns}
         try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            for line_num, line in enumerate(lines, 1):
-                if regex.search(line):
-                    # Get context lines
-                    start = max(0, line_num - 1 - context_lines)
-                    end = min(len(lines), line_num + context_lines)
-
-                    match = {
-                        "line_num": line_num,
-                        "content": line.rstrip("\n"),
-                        "context_before": [
-                            l.rstrip("\n") for l in lines[start : line_num - 1]
-                        ],
-                        "context_after": [
-                            l.rstrip("\n") for l in lines[line_num : end]
-                        ],
-                    }
-                    matches.append(match)
-
-                    # Limit results to prevent overwhelming output
-                    if len(matches) >= max_matches:
-                        break
-
-            return matches
+            text, lines, terminated = self._text_lines()
+
+            if combined is not None:
+                candidates = _matching_lines(combined, text, lines, terminated, per_line)
+            else:
+                candidates = range(len(lines))
+            for idx in candidates:
+                # Test the line as readlines() would return it
+                line = lines[idx] + "\n" if terminated or idx < len(lines) - 1 else lines[idx]
+                for pattern, regex, literal in zip(patterns, regexes, literals):
+                    bucket = results[pattern]
+                    if len(bucket) >= max_matches or (literal is not None and literal not in line):
+                        continue
+                    if regex.search(line):
+                        bucket.append(self._match_entry(lines, idx + 1, context_lines))
+
+            return results
 
         except Exception as e:
             raise IOError(f"Error searching file: {e}")
+
+    @staticmethod
+    def _match_entry(lines: list[str], line_num: int, context_lines: int) -> dict:
+        """Build a match dict for lines[line_num - 1] (without newlines) with context."""
+        return {
+            "line_num": line_num,
+            "content": lines[line_num - 1],
+            "context_before": lines[max(0, line_num - 1 - context_lines) : line_num - 1],
+            "context_after": lines[line_num : line_num + context_lines],
+        }
@@ -1,11 +1,15 @@
 """Prompts and prompt generation for Dockerfile generation agents."""
 
-from pathlib import Path
+import os
+import re
+
+# First fenced code block: marker line, then content up to the closing marker or end of text
+_CODE_BLOCK_RE = re.compile(r"^[^\S\n]*```[^\n]*\n(.*?)(?:(^[^\S\n]*```)|\Z)", re.MULTILINE | re.DOTALL)
 
 
 def build_file_metadata(file_reader, script_path: str) -> str:
     """Build file metadata string for prompts."""
-    filename = Path(script_path).name
+    filename = os.path.basename(script_path)
     size_str = (
         f"{file_reader.size / 1024:.1f}KB"
         if file_reader.size >= 1024
@@ -21,7 +25,7 @@ def build_file_metadata(file_reader, script_path: str) -> str:
 def build_content_section(file_reader, use_search_tool: bool) -> str:
     """Build content section for prompt based on file size and tool availability."""
     if use_search_tool:
-        filename = Path(file_reader.file_path).name
+        filename = os.path.basename(file_reader.file_path)
         return f"File path available for search_in_file tool. File extension: {filename}"
     else:
         return f"""Script content:
@@ -30,9 +34,7 @@ def build_content_section(file_reader, use_search_tool: bool) -> str:
 ```"""
 
 
-def build_system_prompt(use_search_tool: bool, docker_available: bool, provider: str = None) -> str:
-    """Build system prompt based on whether search tool and Docker are available."""
-    base_instructions = """You are an expert Dockerfile generation assistant.
+_BASE_INSTRUCTIONS = """You are an expert Dockerfile generation assistant.
 
 CRITICAL: Your response MUST contain ONLY a Dockerfile wrapped in a code block (```dockerfile ... ```). No explanations, no reasoning, no other text before or after.
 
@@ -43,16 +45,25 @@ Generate an optimal Dockerfile that:
 4. Handles command-line arguments correctly
 5. Follows Docker best practices (minimal layers, efficient caching)"""
 
-    if docker_available:
-        test_instructions = "\n\nYou have access to test_dockerfile tool to validate your Dockerfile. Use it to test and iterate until the test passes."
-    else:
-        test_instructions = "\n\nDocker client is not available. Generate the best Dockerfile you can based on the script analysis. Testing will not be possible."
+_TEST_INSTRUCTIONS = "\n\nYou have access to test_dockerfile tool to validate your Dockerfile. Use it to test and iterate until the test passes. To compare alternative Dockerfiles, test_dockerfile_candidates tests several at once."
 
-    if use_search_tool:
-        search_instructions = "\n\nYou have access to search_in_file tool to find imports, dependencies, and entry points in files. Use it to efficiently find what you need."
-        return base_instructions + search_instructions + test_instructions
-    else:
-        return base_instructions + test_instructions
+_NO_DOCKER_INSTRUCTIONS = "\n\nDocker client is not available. Generate the best Dockerfile you can based on the script analysis. Testing will not be possible."
+
+_SEARCH_INSTRUCTIONS = "\n\nYou have access to search_in_file tool to find imports, dependencies, and entry points in files. Use it to efficiently find what you need. search_in_file_batch searches for several patterns in one pass."
+
+# Every system prompt variant, keyed by (use_search_tool, docker_available)
+_SYSTEM_PROMPTS = {
+    (use_search, docker): _BASE_INSTRUCTIONS
+    + (_SEARCH_INSTRUCTIONS if use_search else "")
+    + (_TEST_INSTRUCTIONS if docker else _NO_DOCKER_INSTRUCTIONS)
+    for use_search in (False, True)
+    for docker in (False, True)
+}
+
+
+def build_system_prompt(use_search_tool: bool, docker_available: bool, provider: str = None) -> str:
+    """Build system prompt based on whether search tool and Docker are available."""
+    return _SYSTEM_PROMPTS[bool(use_search_tool), bool(docker_available)]
 
 
 def extract_dockerfile(content: str) -> str:
@@ -60,37 +71,15 @@ def extract_dockerfile(content: str) -> str:
     if not isinstance(content, str):
         return content
 
-    lines = content.split("\n")
-
-    # Find the Dockerfile code block (between ``` markers)
-    in_dockerfile_block = False
-    dockerfile_lines = []
-    found_block = False
-
-    for line in lines:
-        # Check for opening code block marker
-        if line.strip().startswith("```"):
-            if not found_block:  # First code block found
-                in_dockerfile_block = True
-                found_block = True
-                # Skip the opening marker and any language specifier (e.g., ```dockerfile)
-                continue
-            else:
-                # Closing code block marker
-                in_dockerfile_block = False
-                break
-
-        # Collect lines within the code block
-        if in_dockerfile_block:
-            dockerfile_lines.append(line)
-
-    # If we found a code block, return its content
-    if dockerfile_lines:
-        return "\n".join(dockerfile_lines).strip()
+    # Content of the first code block (the opening marker and any language
+    # specifier, e.g. ```dockerfile, are skipped); an unclosed block runs to the end
+    match = _CODE_BLOCK_RE.search(content)
+    if match and (match.group(1) or match.group(2) is None):
+        return match.group(1).strip()
 
     # Fallback: if no code blocks found, try the old method
     if content.startswith("```"):
-        lines = [l for l in lines if not l.startswith("```")]
+        lines = [l for l in content.split("\n") if not l.startswith("```")]
         return "\n".join(lines).strip()
 
     return content
@@ -8,40 +8,102 @@ import sys
 import csv
 from io import StringIO
 from collections import defaultdict, Counter
-from typing import Dict, List, Tuple, Any
-
-def parse_csv(data: str) -> Tuple[List[str], List[Dict[str, str]]]:
-    """Parse CSV data and return headers and rows."""
-    reader = csv.DictReader(StringIO(data))
-    headers = reader.fieldnames or []
-    rows = list(reader)
-    return headers, rows
+from typing import Dict, List, Tuple, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columns are then analyzed in pure Python
+    np = None
+
+# Columns longer than this try the vectorized NumPy path first
+NUMPY_MIN_VALUES = 512
+
+def parse_csv(data: str) -> Tuple[List[str], List[List[str]]]:
+    """Parse CSV data and return headers and the values of each column."""
+    reader = csv.reader(StringIO(data))
+    # Blank lines are skipped, as csv.DictReader does
+    headers = next((row for row in reader if row), [])
+    width = len(headers)
+    columns: List[List[str]] = [[] for _ in headers]
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row += [''] * (width - len(row))
+        for column, value in zip(columns, row):
+            column.append(value)
+    return headers, columns
+
+def numeric_stats_numpy(values: List[str]) -> Optional[Tuple[float, float, float]]:
+    """Return (min, max, avg) if every value parses as a finite number, else None."""
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except ValueError:
+        return None
+    if not np.isfinite(arr).all():
+        return None
+    return float(arr.min()), float(arr.max()), float(arr.mean())
 
 def analyze_column(values: List[str], column_name: str) -> Dict[str, Any]:
     """Analyze a single column for statistics."""
+    # Long, fully numeric columns are parsed and reduced by NumPy in C;
+    # anything else (blanks, text, NaN/inf) falls through to the Python loop
+    if np is not None and len(values) > NUMPY_MIN_VALUES:
+        numeric = numeric_stats_numpy(values)
+        if numeric is not None:
+            counter = Counter(values)
+            return {
+                'name': column_name,
+                'total': len(values),
+                'non_empty': len(values),
+                'empty': 0,
+                'numeric_count': len(values),
+                'min': numeric[0],
+                'max': numeric[1],
+                'avg': numeric[2],
+                'most_common': counter.most_common(3),
+                'unique_count': len(counter),
+            }
+
+    # One pass collects the empty counts, value counts and numeric aggregates
+    empty = 0
+    counter: Counter = Counter()
+    numeric_count = 0
+    total = 0.0
+    minimum = maximum = None
+    for v in values:
+        counter[v] += 1
+        if not v.strip():
+            empty += 1
+            continue  # Blank strings never parse as numbers
+        try:
+            x = float(v)
+        except ValueError:
+            continue
+        if numeric_count == 0:
+            minimum = maximum = x
+        else:
+            if x < minimum:
+                minimum = x
+            if x > maximum:
+                maximum = x
+        numeric_count += 1
+        total += x
+
     stats = {
         'name': column_name,
         'total': len(values),
-        'non_empty': len([v for v in values if v.strip()]),
-        'empty': len([v for v in values if not v.strip()]),
+        'non_empty': len(values) - empty,
+        'empty': empty,
     }
 
-    # Try numeric analysis
-    numeric_values = []
-    for v in values:
-        try:
-            numeric_values.append(float(v))
-        except (ValueError, TypeError):
-            pass
-
-    if numeric_values:
-        stats['numeric_count'] = len(numeric_values)
-        stats['min'] = min(numeric_values)
-        stats['max'] = max(numeric_values)
-        stats['avg'] = sum(numeric_values) / len(numeric_values)
+    if numeric_count:
+        stats['numeric_count'] = numeric_count
+        stats['min'] = minimum
+        stats['max'] = maximum
+        stats['avg'] = total / numeric_count
 
     # Most common values
-    counter = Counter(values)
     stats['most_common'] = counter.most_common(3)
     stats['unique_count'] = len(counter)
 
@@ -49,20 +111,20 @@ def analyze_column(values: List[str], column_name: str) -> Dict[str, Any]:
 
 def analyze_csv(data: str) -> Dict[str, Any]:
     """Analyze CSV data comprehensively."""
-    headers, rows = parse_csv(data)
+    headers, columns = parse_csv(data)
+    row_count = len(columns[0]) if columns else 0
 
-    if not headers or not rows:
+    if not headers or not row_count:
         return {'error': 'Invalid CSV data'}
 
     analysis = {
-        'rows': len(rows),
+        'rows': row_count,
         'columns': len(headers),
         'column_stats': {}
     }
 
     # Analyze each column
-    for header in headers:
-        values = [row.get(header, '') for row in rows]
+    for header, values in zip(headers, columns):
         analysis['column_stats'][header] = analyze_column(values, header)
 
     return analysis
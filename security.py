@@ -2,7 +2,7 @@
 
 import os
 import re
-from pathlib import Path
+import stat
 
 
 class SecurityError(Exception):
@@ -10,6 +10,41 @@ class SecurityError(Exception):
     pass
 
 
+# Suspicious patterns that could indicate prompt injection
+INJECTION_PATTERNS = (
+    r"ignore\s+(?:all\s+)?(?:previous|prior|initial).*instructions",
+    r"forget\s+(?:all\s+)?(?:previous|prior|initial|context)",
+    r"new\s+instructions?:",
+    r"override\s+(?:all\s+)?previous",
+    r"disregard\s+(?:all\s+)?previous",
+    r"execute\s+.*code",
+    r"run\s+.*command",
+    r"system\s+command",
+)
+
+# All patterns as one case-insensitive alternation so the text is scanned
+# once, without per-pattern passes or a lowercased copy
+_INJECTION_RE = re.compile("|".join(f"(?:{p})" for p in INJECTION_PATTERNS), re.IGNORECASE)
+
+# Shell metacharacters counted by detect_prompt_injection
+_METACHARS = (";", "|", "&&")
+
+
+# sanitize_docker_input in one translate pass: control characters (including
+# null) are dropped, except newline, tab and carriage return, and single
+# quotes are escaped for shell contexts
+_SANITIZE_TABLE = dict.fromkeys(c for c in range(32) if chr(c) not in "\n\t\r")
+_SANITIZE_TABLE[ord("'")] = "'\\''"
+
+
+def _is_within(path: str, base_abs: str) -> bool:
+    """Return True if resolved path lies inside resolved directory base_abs."""
+    try:
+        return os.path.commonpath([path, base_abs]) == base_abs
+    except ValueError:  # e.g. different drives
+        return False
+
+
 def validate_file_path(file_path: str, base_dir: str = None) -> str:
     """
     Validate file path to prevent traversal attacks.
@@ -24,24 +59,40 @@ def validate_file_path(file_path: str, base_dir: str = None) -> str:
     Raises:
         SecurityError: If path traversal detected or file not found
     """
-    try:
-        # Resolve to absolute path
-        abs_path = Path(file_path).resolve()
+    return stat_file_path(file_path, base_dir)[0]
 
-        # Check if file exists
-        if not abs_path.exists():
-            raise SecurityError(f"File not found: {file_path}")
 
-        # Check if it's a file (not directory)
-        if not abs_path.is_file():
+def stat_file_path(file_path: str, base_dir: str = None) -> tuple[str, os.stat_result]:
+    """
+    Validate file path like validate_file_path and also return its stat result.
+
+    Callers can pass the stat result on to check_file_size and FileReader
+    instead of stat-ing the file again.
+
+    Args:
+        file_path: Path to validate
+        base_dir: Optional base directory to restrict to
+
+    Returns:
+        Tuple of (absolute path, os.stat_result)
+
+    Raises:
+        SecurityError: If path traversal detected or file not found
+    """
+    try:
+        # Resolve to an absolute path in one call; strict mode fails on a
+        # missing component, and one stat answers "is a regular file"
+        try:
+            abs_path = os.path.realpath(file_path, strict=True)
+            st = os.stat(abs_path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise SecurityError(f"File not found: {file_path}")
+        if not stat.S_ISREG(st.st_mode):
             raise SecurityError(f"Not a file: {file_path}")
 
         # If base_dir specified, ensure path is within it
         if base_dir:
-            base_abs = Path(base_dir).resolve()
-            try:
-                abs_path.relative_to(base_abs)
-            except ValueError:
+            if not _is_within(abs_path, os.path.realpath(base_dir)):
                 raise SecurityError(
                     f"Path {file_path} is outside allowed directory {base_dir}"
                 )
@@ -51,7 +102,7 @@ def validate_file_path(file_path: str, base_dir: str = None) -> str:
             # Warn but allow if resolved path is valid
             print(f"Warning: Using unusual path syntax: {file_path}")
 
-        return str(abs_path)
+        return abs_path, st
 
     except SecurityError:
         raise
@@ -59,9 +110,83 @@ def validate_file_path(file_path: str, base_dir: str = None) -> str:
         raise SecurityError(f"Invalid file path: {e}")
 
 
+def validate_batch(paths: list[str], base_dir: str = None) -> list[tuple[str, os.stat_result]]:
+    """
+    Validate several file paths, stat-ing each one exactly once.
+
+    The results can be handed to check_file_size and FileReader.from_stat so
+    no file is stat-ed again further down the pipeline.
+
+    Args:
+        paths: Paths to validate
+        base_dir: Optional base directory to restrict to
+
+    Returns:
+        List of (absolute path, os.stat_result) tuples, in the order of paths
+
+    Raises:
+        SecurityError: If any path fails validation
+    """
+    return [stat_file_path(path, base_dir) for path in paths]
+
+
+def validate_directory(dir_path: str, base_dir: str = None) -> list[tuple[str, os.stat_result]]:
+    """
+    Validate every regular file directly inside a directory.
+
+    The directory is listed with os.scandir, whose entries already know
+    their file type, and the directory itself is resolved and checked
+    against base_dir once rather than per file. A symlinked file's target
+    may lie elsewhere, so it is resolved and checked against base_dir too;
+    the link is still returned under its own path, keeping names unique.
+
+    Args:
+        dir_path: Directory whose files to validate
+        base_dir: Optional base directory to restrict to
+
+    Returns:
+        List of (absolute path, os.stat_result) tuples, sorted by file name
+
+    Raises:
+        SecurityError: If the directory or any file in it fails validation
+    """
+    try:
+        dir_abs = os.path.realpath(dir_path, strict=True)
+        entries = sorted(os.scandir(dir_abs), key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        raise SecurityError(f"Directory not found: {dir_path}")
+    except OSError as e:
+        raise SecurityError(f"Invalid directory: {e}")
+
+    base_abs = os.path.realpath(base_dir) if base_dir else None
+    if base_abs and not _is_within(dir_abs, base_abs):
+        raise SecurityError(
+            f"Path {dir_path} is outside allowed directory {base_dir}"
+        )
+
+    results = []
+    for entry in entries:
+        if entry.is_symlink():
+            if not entry.is_file():
+                continue  # Dangling, or not a link to a regular file
+            target = os.path.realpath(entry.path)
+            if base_abs and not _is_within(target, base_abs):
+                raise SecurityError(
+                    f"Path {entry.path} is outside allowed directory {base_dir}"
+                )
+            try:
+                results.append((entry.path, os.stat(target)))
+            except OSError as e:
+                raise SecurityError(f"Invalid file path: {e}")
+        elif entry.is_file(follow_symlinks=False):
+            results.append((entry.path, entry.stat(follow_symlinks=False)))
+    return results
+
+
 def check_file_size(
     file_path: str,
-    max_size_bytes: int = 500 * 1024  # 500KB default
+    max_size_bytes: int = 500 * 1024,  # 500KB default
+    stat_result: os.stat_result = None
 ) -> tuple[bool, int]:
     """
     Check if file size is within limits.
@@ -69,12 +194,13 @@ def check_file_size(
     Args:
         file_path: Path to file
         max_size_bytes: Maximum allowed size in bytes
+        stat_result: Stat result already fetched for file_path (skips another stat)
 
     Returns:
         Tuple of (is_within_limit, actual_size)
     """
     try:
-        size = os.path.getsize(file_path)
+        size = stat_result.st_size if stat_result is not None else os.path.getsize(file_path)
         return size <= max_size_bytes, size
     except Exception as e:
         raise SecurityError(f"Cannot check file size: {e}")
@@ -93,30 +219,18 @@ def detect_prompt_injection(content: str) -> bool:
     if not content or not isinstance(content, str):
         return False
 
-    # Convert to lowercase for matching
-    lower_content = content.lower()
-
-    # Suspicious patterns
-    patterns = [
-        r"ignore\s+(?:all\s+)?(?:previous|prior|initial).*instructions",
-        r"forget\s+(?:all\s+)?(?:previous|prior|initial|context)",
-        r"new\s+instructions?:",
-        r"override\s+(?:all\s+)?previous",
-        r"disregard\s+(?:all\s+)?previous",
-        r"execute\s+.*code",
-        r"run\s+.*command",
-        r"system\s+command",
-    ]
-
-    for pattern in patterns:
-        if re.search(pattern, lower_content):
-            return True
-
-    # Check for excessive shell metacharacters (possible command injection)
-    dangerous_chars = lower_content.count(";") + lower_content.count("|") + lower_content.count("&&")
-    if dangerous_chars > 5:  # Arbitrary threshold
+    if _INJECTION_RE.search(content):
         return True
 
+    # Check for excessive shell metacharacters (possible command injection).
+    # str.count scans in C and beats a regex over clean text; stop counting
+    # as soon as the threshold is passed.
+    dangerous_chars = 0
+    for metachar in _METACHARS:
+        dangerous_chars += content.count(metachar)
+        if dangerous_chars > 5:  # Arbitrary threshold
+            return True
+
     return False
 
 
@@ -133,16 +247,6 @@ def sanitize_docker_input(content: str) -> str:
     if not content:
         return content
 
-    # Remove null bytes
-    content = content.replace("\x00", "")
-
-    # Remove control characters except newline, tab, carriage return
-    content = "".join(
-        char for char in content
-        if ord(char) >= 32 or char in "\n\t\r"
-    )
-
-    # Escape quotes for shell contexts
-    content = content.replace("'", "'\\''")
-
-    return content
+    # Remove null bytes and control characters except newline, tab, carriage
+    # return, and escape quotes for shell contexts
+    return content.translate(_SANITIZE_TABLE)
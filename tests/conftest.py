@@ -1,5 +1,7 @@
 """Pytest configuration for the tests directory."""
 
+import itertools
+
 import pytest
 
 
@@ -16,3 +18,43 @@ def pytest_collection_modifyitems(config, items):
             continue
         filtered.append(item)
     items[:] = filtered
+
+
+@pytest.fixture(scope="module")
+def script_path(tmp_path_factory):
+    """Small script file shared by the tests of a module."""
+    path = tmp_path_factory.mktemp("script") / "script.py"
+    path.write_text("import os")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def large_script_path(tmp_path_factory):
+    """Script file over the 100 byte threshold the tests use for large files."""
+    path = tmp_path_factory.mktemp("script") / "large_script.py"
+    path.write_text("import os\n" + "x" * 200)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def example_file(tmp_path_factory):
+    """Example usage file shared by the whole session."""
+    path = tmp_path_factory.mktemp("example") / "example.txt"
+    path.write_text("INPUT: test\nEXPECTED_OUTPUT: result")
+    return str(path)
+
+
+@pytest.fixture
+def make_file(tmp_path):
+    """Factory that writes str or bytes content to a new file under tmp_path."""
+    counter = itertools.count()
+
+    def make(content="", suffix=".py"):
+        path = tmp_path / f"file{next(counter)}{suffix}"
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, newline="")
+        return str(path)
+
+    return make
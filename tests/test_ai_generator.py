@@ -1,291 +1,311 @@
 """Tests for docker_wrapper_agent module - DockerfileAgent with conditional tools."""
 
-import os
-import tempfile
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
-from docker_wrapper_agent import DockerfileAgent, DockerfileOutput
+from pydantic_ai import Agent
+
+from docker_wrapper_agent import DockerfileAgent, DockerfileOutput, get_agent
 from file_handler import FileReader
 
 
-def _create_example_file(tmpdir, content="INPUT: test\nEXPECTED_OUTPUT: result"):
-    """Helper to create example usage file."""
-    example_file = tmpdir.join("example.txt")
-    example_file.write(content)
-    return str(example_file)
+@pytest.fixture(autouse=True)
+def clear_agent_cache():
+    """Each test patches Agent, so don't reuse agents cached by earlier tests."""
+    get_agent.cache_clear()
+    yield
+    get_agent.cache_clear()
+
+
+@pytest.fixture(scope="module")
+def small_reader(script_path):
+    """FileReader for the shared small script, built once per module."""
+    return FileReader(script_path, threshold=1000)
+
+
+@pytest.fixture(scope="module")
+def large_reader(large_script_path):
+    """FileReader treating the shared large script as large, built once per module."""
+    return FileReader(large_script_path, threshold=100)
+
+
+def _patch_agent(monkeypatch, docker_available):
+    """Replace the pydantic_ai Agent class and the Docker check in docker_wrapper_agent."""
+    # Spec'd so only real Agent attributes can be used or asserted on
+    mock_agent = Mock(spec=Agent)
+    # Keep registered tool functions reachable as mock_agent.tools[name]
+    mock_agent.tools = {}
+    mock_agent.tool.side_effect = lambda func: mock_agent.tools.setdefault(func.__name__, func)
+    mock_agent_class = Mock(return_value=mock_agent)
+    monkeypatch.setattr('docker_wrapper_agent.Agent', mock_agent_class)
+    monkeypatch.setattr('docker_wrapper_agent.check_docker_available', lambda: docker_available)
+    return mock_agent_class, mock_agent
+
+
+def _recording_run_sync(prompts, output):
+    """Stand-in for Agent.run_sync that records prompts and returns a fixed output."""
+    def run_sync(prompt, **kwargs):
+        prompts.append(prompt)
+        return SimpleNamespace(output=output)
+    return run_sync
+
+
+@pytest.fixture
+def patched_agent(monkeypatch):
+    """Mocked (Agent class, Agent instance) with Docker available."""
+    return _patch_agent(monkeypatch, True)
+
+
+@pytest.fixture
+def patched_agent_no_docker(monkeypatch):
+    """Mocked (Agent class, Agent instance) with Docker unavailable."""
+    return _patch_agent(monkeypatch, False)
 
 
 class TestDockerfileAgent:
     """Tests for DockerfileAgent initialization."""
 
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_agent_openai(self, mock_docker_check, mock_agent_class, tmpdir):
-        """Should create OpenAI agent with correct model."""
-        mock_agent = Mock()
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-
-                assert mock_agent_class.called
-                call_args = mock_agent_class.call_args
-                assert 'gpt-4o-mini' in str(call_args)
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_agent_gemini(self, mock_docker_check, mock_agent_class, tmpdir):
-        """Should create Gemini agent with correct model."""
-        mock_agent = Mock()
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('gemini', 'test-key', file_reader, f.name, example_file)
-
-                assert mock_agent_class.called
-                call_args = mock_agent_class.call_args
-                assert 'gemini-2.5-flash' in str(call_args)
-            finally:
-                os.unlink(f.name)
-
-    def test_agent_invalid_provider(self, tmpdir):
+    @pytest.mark.parametrize("provider,expected", [
+        ('openai', 'gpt-4o-mini'),
+        ('gemini', 'gemini-2.5-flash'),
+    ])
+    def test_agent_model(self, provider, expected, patched_agent, script_path, example_file, small_reader):
+        """Should create the agent with the provider's model."""
+        mock_agent_class, _ = patched_agent
+
+        agent = DockerfileAgent(provider, 'test-key', small_reader, script_path, example_file)
+
+        assert mock_agent_class.called
+        assert expected in str(mock_agent_class.call_args)
+
+    def test_agent_shared_per_configuration(self, patched_agent, script_path, example_file, small_reader):
+        """Agents with the same configuration should share one pydantic_ai Agent."""
+        mock_agent_class, _ = patched_agent
+
+        first = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        second = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+
+        assert mock_agent_class.call_count == 1
+        assert first.agent is second.agent
+        # Per-run state stays separate
+        assert first.deps is not second.deps
+        assert first.deps.dirty_images is not second.deps.dirty_images
+
+        first.generate()
+        assert first.agent.run_sync.call_args.kwargs['deps'] is first.deps
+
+    def test_agent_invalid_provider(self, script_path, example_file, small_reader):
         """Should raise ValueError for invalid provider."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                with pytest.raises(ValueError, match="Unsupported provider"):
-                    DockerfileAgent('invalid', 'test-key', file_reader, f.name, example_file)
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_agent_system_prompt_small_file(self, mock_docker_check, mock_agent_class, tmpdir):
+        with pytest.raises(ValueError, match="Unsupported provider"):
+            DockerfileAgent('invalid', 'test-key', small_reader, script_path, example_file)
+
+    def test_agent_system_prompt_small_file(self, patched_agent, script_path, example_file, small_reader):
         """Small file agent should have test_dockerfile in system prompt when Docker available."""
-        mock_agent = Mock()
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-
-                call_kwargs = mock_agent_class.call_args.kwargs
-                assert 'system_prompt' in call_kwargs
-                assert 'Dockerfile' in call_kwargs['system_prompt']
-                assert 'test_dockerfile' in call_kwargs['system_prompt']
-                assert 'Docker client is not available' not in call_kwargs['system_prompt']
-                # Small file should NOT have search_in_file
-                assert 'search_in_file' not in call_kwargs['system_prompt']
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_agent_system_prompt_large_file(self, mock_docker_check, mock_agent_class, tmpdir):
+        mock_agent_class, _ = patched_agent
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+
+        prompt = mock_agent_class.call_args.kwargs['system_prompt']
+        # Small file should NOT have search_in_file
+        assert all(s in prompt for s in ('Dockerfile', 'test_dockerfile'))
+        assert not any(s in prompt for s in ('search_in_file', 'Docker client is not available'))
+
+    def test_agent_system_prompt_large_file(self, patched_agent, large_script_path, example_file, large_reader):
         """Large file agent should have search_in_file and test_dockerfile in system prompt."""
-        mock_agent = Mock()
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os\n" + "x" * 200)
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=100)  # Force large
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-
-                call_kwargs = mock_agent_class.call_args.kwargs
-                assert 'system_prompt' in call_kwargs
-                assert 'Dockerfile' in call_kwargs['system_prompt']
-                assert 'test_dockerfile' in call_kwargs['system_prompt']
-                # Large file should have search_in_file
-                assert 'search_in_file' in call_kwargs['system_prompt']
-            finally:
-                os.unlink(f.name)
+        mock_agent_class, _ = patched_agent
+
+        agent = DockerfileAgent('openai', 'test-key', large_reader, large_script_path, example_file)
+
+        prompt = mock_agent_class.call_args.kwargs['system_prompt']
+        # Large file should have search_in_file
+        assert all(s in prompt for s in ('Dockerfile', 'test_dockerfile', 'search_in_file'))
+
+    @patch('docker_wrapper_agent.reap_pulls')
+    @patch('docker_wrapper_agent.prepull_base_images')
+    def test_agent_prepull_reaped_on_cleanup(self, mock_prepull, mock_reap, patched_agent,
+                                             script_path, example_file, small_reader):
+        """Background pulls started at init should be reaped by cleanup()."""
+        pulls = [Mock(), Mock()]
+        mock_prepull.return_value = pulls
+
+        with DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file,
+                             prepull_images=True):
+            assert mock_prepull.called
+            assert not mock_reap.called
+
+        mock_reap.assert_called_once_with(pulls)
 
 
 class TestDockerfileAgentGenerate:
     """Tests for DockerfileAgent.generate() method."""
 
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_generate_small_file(self, mock_docker_check, mock_agent_class, tmpdir):
+    def test_generate_small_file(self, patched_agent, script_path, example_file, small_reader):
         """Should handle small files by including full content."""
-        mock_agent = Mock()
-        mock_result = Mock()
-        mock_result.output = "FROM python:3.11\nRUN pip install numpy"
-        mock_agent.run_sync.return_value = mock_result
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import numpy\nprint('hello')")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-                result = agent.generate()
-
-                assert result.success
-                assert "FROM python" in result.dockerfile
-                assert mock_agent.run_sync.called
-                # Verify full content is in prompt
-                call_args = mock_agent.run_sync.call_args
-                prompt = call_args.args[0]
-                assert "import numpy" in prompt
-                assert "Script content:" in prompt
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_generate_large_file(self, mock_docker_check, mock_agent_class, tmpdir):
+        _, mock_agent = patched_agent
+        prompts = []
+        mock_agent.run_sync = _recording_run_sync(prompts, "FROM python:3.11\nRUN pip install numpy")
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        result = agent.generate()
+
+        assert result.success
+        assert "FROM python" in result.dockerfile
+        # Verify full content is in prompt
+        prompt, = prompts
+        assert "import os" in prompt
+        assert "Script content:" in prompt
+
+    def test_generate_large_file(self, patched_agent, large_script_path, example_file, large_reader):
         """Should handle large files with search guidance."""
-        mock_agent = Mock()
-        mock_result = Mock()
-        mock_result.output = "FROM python:3.11\nRUN pip install requests"
-        mock_agent.run_sync.return_value = mock_result
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import requests\n" + "x" * 200)
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=100)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-                result = agent.generate()
-
-                assert result.success
-                assert "FROM python" in result.dockerfile
-                # Verify search guidance is in prompt
-                call_args = mock_agent.run_sync.call_args
-                prompt = call_args.args[0]
-                assert 'search_in_file' in prompt
-                assert '^import |^from' in prompt
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_generate_markdown_removal(self, mock_docker_check, mock_agent_class, tmpdir):
+        _, mock_agent = patched_agent
+        prompts = []
+        mock_agent.run_sync = _recording_run_sync(prompts, "FROM python:3.11\nRUN pip install requests")
+
+        agent = DockerfileAgent('openai', 'test-key', large_reader, large_script_path, example_file)
+        result = agent.generate()
+
+        assert result.success
+        assert "FROM python" in result.dockerfile
+        # Verify search guidance is in prompt
+        prompt, = prompts
+        assert 'search_in_file' in prompt
+        assert '^import |^from' in prompt
+
+    def test_generate_markdown_removal(self, patched_agent, script_path, example_file, small_reader):
         """Should remove markdown code blocks from response."""
-        mock_agent = Mock()
-        mock_result = Mock()
-        mock_result.output = "```dockerfile\nFROM python:3.11\nRUN pip install numpy\n```"
+        _, mock_agent = patched_agent
+        mock_result = SimpleNamespace(output="```dockerfile\nFROM python:3.11\nRUN pip install numpy\n```")
         mock_agent.run_sync.return_value = mock_result
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import numpy")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-                result = agent.generate()
-
-                assert not result.dockerfile.startswith("```")
-                assert "FROM python" in result.dockerfile
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_generate_api_error(self, mock_docker_check, mock_agent_class, tmpdir):
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        result = agent.generate()
+
+        assert not result.dockerfile.startswith("```")
+        assert "FROM python" in result.dockerfile
+
+    @patch('docker_wrapper_agent.build_content_section', return_value="Script content:\n...")
+    def test_generate_reuses_prompt_prefix(self, mock_content, patched_agent, script_path, example_file, small_reader):
+        """Repeated generate() calls should not rebuild the content section."""
+        _, mock_agent = patched_agent
+        mock_agent.run_sync.return_value = SimpleNamespace(output="FROM python:3.11")
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        agent.generate()
+        agent.generate()
+
+        assert mock_content.call_count == 1
+        assert "Script content:" in mock_agent.run_sync.call_args.args[0]
+
+    def test_generate_uses_given_example_content(self, patched_agent, script_path, small_reader):
+        """Already-read example content should be used without opening the file."""
+        _, mock_agent = patched_agent
+        mock_agent.run_sync.return_value = SimpleNamespace(output="FROM python:3.11")
+
+        agent = DockerfileAgent(
+            'openai', 'test-key', small_reader, script_path, '/nonexistent/example.txt',
+            example_content="Input: abc\nOutput: cba",
+        )
+        agent.generate()
+
+        assert "Input: abc" in mock_agent.run_sync.call_args.args[0]
+
+    def test_generate_api_error(self, patched_agent, script_path, example_file, small_reader):
         """Should handle API errors gracefully."""
-        mock_agent = Mock()
+        _, mock_agent = patched_agent
         mock_agent.run_sync.side_effect = Exception("API error")
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = True
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-                result = agent.generate()
-
-                assert not result.success
-                assert "Generation error" in result.reasoning
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_agent_system_prompt_no_docker(self, mock_docker_check, mock_agent_class, tmpdir):
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        result = agent.generate()
+
+        assert not result.success
+        assert "Generation error" in result.reasoning
+
+    def test_agent_system_prompt_no_docker(self, patched_agent_no_docker, script_path, example_file, small_reader):
         """System prompt should indicate Docker is not available when client unavailable."""
-        mock_agent = Mock()
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = False
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import os")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-
-                call_kwargs = mock_agent_class.call_args.kwargs
-                assert 'system_prompt' in call_kwargs
-                assert 'Docker client is not available' in call_kwargs['system_prompt']
-                assert 'test_dockerfile' not in call_kwargs['system_prompt']
-            finally:
-                os.unlink(f.name)
-
-    @patch('docker_wrapper_agent.Agent')
-    @patch('docker_wrapper_agent.check_docker_available')
-    def test_generate_no_docker(self, mock_docker_check, mock_agent_class, tmpdir):
+        mock_agent_class, _ = patched_agent_no_docker
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+
+        prompt = mock_agent_class.call_args.kwargs['system_prompt']
+        assert 'Docker client is not available' in prompt
+        assert 'test_dockerfile' not in prompt
+
+    def test_generate_no_docker(self, patched_agent_no_docker, script_path, example_file, small_reader):
         """Should work without test_dockerfile if Docker unavailable and note it in result."""
-        mock_agent = Mock()
-        mock_result = Mock()
-        mock_result.output = "FROM python:3.11"
+        _, mock_agent = patched_agent_no_docker
+        mock_result = SimpleNamespace(output="FROM python:3.11")
         mock_agent.run_sync.return_value = mock_result
-        mock_agent_class.return_value = mock_agent
-        mock_docker_check.return_value = False
-
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("print('hello')")
-            f.flush()
-            try:
-                example_file = _create_example_file(tmpdir)
-                file_reader = FileReader(f.name, threshold=1000)
-                agent = DockerfileAgent('openai', 'test-key', file_reader, f.name, example_file)
-                result = agent.generate()
-
-                assert result.success
-                assert "FROM python" in result.dockerfile
-                assert result.reasoning is not None
-                assert "Docker client was not available" in result.reasoning
-            finally:
-                os.unlink(f.name)
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        result = agent.generate()
+
+        assert result.success
+        assert "FROM python" in result.dockerfile
+        assert result.reasoning is not None
+        assert "Docker client was not available" in result.reasoning
+
+    @patch('docker_wrapper_agent.remove_images')
+    @patch('docker_wrapper_agent.prune_images_if_needed')
+    @patch('docker_wrapper_agent.run_test_dockerfile')
+    def test_test_dockerfile_tag_per_call(self, mock_test, mock_prune_if_needed, mock_remove,
+                                          patched_agent, script_path, example_file, small_reader):
+        """Each test_dockerfile call should build its own image, reusing the last good one's layers."""
+        _, mock_agent = patched_agent
+        mock_test.side_effect = [
+            SimpleNamespace(success=True, build_errors=None, runtime_errors=None,
+                            output_diff=None, actual_output=None),
+            SimpleNamespace(success=False, build_errors="boom", runtime_errors=None,
+                            output_diff=None, actual_output=None),
+            SimpleNamespace(success=True, build_errors=None, runtime_errors=None,
+                            output_diff=None, actual_output=None),
+        ]
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+        ctx = SimpleNamespace(deps=agent.deps)
+        test_dockerfile = mock_agent.tools['test_dockerfile']
+
+        for _ in range(3):
+            test_dockerfile(ctx, "FROM python:3.11", "input", "output")
+
+        images = [c.kwargs['image_name'] for c in mock_test.call_args_list]
+        assert len(set(images)) == 3
+        # A failed build is never used as the cache source
+        assert [c.kwargs['cache_from'] for c in mock_test.call_args_list] == [None, images[0], images[0]]
+        assert agent.deps.cache_image == images[2]
+        assert mock_prune_if_needed.call_count == 3
+
+        agent.close()
+        agent.close()
+        mock_remove.assert_called_once_with(images)
+
+    @patch('docker_wrapper_agent.remove_images')
+    @patch('docker_wrapper_agent.prune_images_if_needed')
+    @patch('docker_wrapper_agent.run_test_dockerfile_async')
+    def test_test_candidates_picks_first_passing(self, mock_test, mock_prune, mock_remove,
+                                                 patched_agent, script_path, example_file, small_reader):
+        """test_candidates should test every candidate and report the first that passes."""
+        async def fake_test(dockerfile_content, **kwargs):
+            good = "good" in dockerfile_content
+            return SimpleNamespace(success=good, build_errors=None if good else "boom")
+        mock_test.side_effect = fake_test
+
+        agent = DockerfileAgent('openai', 'test-key', small_reader, script_path, example_file)
+
+        passed, results = asyncio.run(agent.test_candidates(
+            ["FROM bad", "FROM good", "FROM good:2"], "input", "output"
+        ))
+
+        assert passed == 1
+        assert [r.success for r in results] == [False, True, True]
+        assert mock_test.call_count == 3
+
+        # Candidate images are kept until cleanup() removes them in one call
+        images = [c.kwargs['image_name'] for c in mock_test.call_args_list]
+        assert len(set(images)) == 3
+        # Builds reuse the last successful build's layers, as test_dockerfile does
+        assert [c.kwargs['cache_from'] for c in mock_test.call_args_list] == [None, None, images[1]]
+        assert agent.deps.cache_image == images[2]
+        assert mock_prune.called
+        agent.cleanup()
+        mock_remove.assert_called_once_with(images)
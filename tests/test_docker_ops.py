@@ -1,136 +1,300 @@
 """Tests for docker_ops module."""
 
 import os
-import tempfile
+import sys
+import time
+import asyncio
+import tarfile
 import pytest
-from unittest.mock import patch, Mock
+from io import BytesIO
+from subprocess import Popen, TimeoutExpired
+from types import SimpleNamespace
+from unittest.mock import patch, Mock, MagicMock
 
 from docker_ops import (
     check_docker_available,
     build_image,
+    build_image_async,
+    prepull_base_images,
+    reap_pulls,
+    prune_dangling_images,
+    prune_images_if_needed,
+    remove_images,
+    BUILD_LOG_TAIL_LINES,
     run_container,
+    run_container_async,
     normalize_output,
     test_dockerfile,
     TestResult,
+    _run_with_log_tail,
+    _run_with_log_tail_async,
+    _unique_name,
+    _DOCKER,
 )
 
 
+# subprocess.run results shared by tests that only read their attributes
+_OK = SimpleNamespace(returncode=0, stdout="", stderr="")
+_FAIL = SimpleNamespace(returncode=1, stdout="", stderr="")
+
+
 class TestCheckDockerAvailable:
     """Tests for Docker availability check."""
 
+    @pytest.fixture(autouse=True)
+    def no_socket_cache(self, monkeypatch):
+        """Start uncached and force the docker CLI fallback."""
+        monkeypatch.setattr('docker_ops._DOCKER_AVAILABLE', None)
+        monkeypatch.setattr('docker_ops._probe_docker_socket', lambda: None)
+
+    @pytest.mark.parametrize("side_effect,result,expected", [
+        (None, _OK, True),
+        (None, _FAIL, False),
+        (Exception("Connection error"), None, False),
+    ], ids=["running", "not_running", "error"])
     @patch('docker_ops.subprocess.run')
-    def test_check_docker_available_running(self, mock_run):
-        """Should return True when Docker is available."""
-        mock_run.return_value = Mock(returncode=0)
-        assert check_docker_available() is True
+    def test_check_docker_available(self, mock_run, side_effect, result, expected):
+        """Should be True only when the docker CLI probe succeeds."""
+        mock_run.side_effect = side_effect
+        mock_run.return_value = result
+        assert check_docker_available() is expected
 
     @patch('docker_ops.subprocess.run')
-    def test_check_docker_available_not_running(self, mock_run):
-        """Should return False when Docker is not available."""
-        mock_run.return_value = Mock(returncode=1)
-        assert check_docker_available() is False
+    def test_check_docker_available_cached(self, mock_run):
+        """Should probe once and reuse the result until refreshed."""
+        mock_run.return_value = _OK
+        assert check_docker_available() is True
+        assert check_docker_available() is True
+        assert mock_run.call_count == 1
+
+        mock_run.return_value = _FAIL
+        assert check_docker_available(refresh=True) is False
+        assert mock_run.call_count == 2
 
     @patch('docker_ops.subprocess.run')
-    def test_check_docker_available_error(self, mock_run):
-        """Should return False on exception."""
-        mock_run.side_effect = Exception("Connection error")
-        assert check_docker_available() is False
+    def test_check_docker_available_socket(self, mock_run, monkeypatch):
+        """Should trust the socket probe and skip the CLI when it answers."""
+        monkeypatch.setattr('docker_ops._probe_docker_socket', lambda: True)
+        assert check_docker_available() is True
+        assert not mock_run.called
 
 
 class TestNormalizeOutput:
     """Tests for output normalization."""
 
-    def test_normalize_output_strips_whitespace(self):
-        """Should strip leading/trailing whitespace."""
-        output = "  hello world  \n"
-        assert normalize_output(output) == "hello world"
+    @pytest.mark.parametrize("raw,expected", [
+        ("  hello world  \n", "hello world"),
+        ("line1\r\nline2\r\nline3", "line1\nline2\nline3"),
+        ("line1\rline2\rline3", "line1\nline2\nline3"),
+        ("line1\r\nline2\rline3\nline4", "line1\nline2\nline3\nline4"),
+    ], ids=["strips_whitespace", "crlf", "cr", "mixed_newlines"])
+    def test_normalize_output(self, raw, expected):
+        """Should strip surrounding whitespace and normalize newlines to LF."""
+        assert normalize_output(raw) == expected
 
-    def test_normalize_output_handles_crlf(self):
-        """Should normalize CRLF to LF."""
-        output = "line1\r\nline2\r\nline3"
-        result = normalize_output(output)
-        assert result == "line1\nline2\nline3"
 
-    def test_normalize_output_handles_cr(self):
-        """Should normalize CR to LF."""
-        output = "line1\rline2\rline3"
-        result = normalize_output(output)
-        assert result == "line1\nline2\nline3"
+def _fake_popen(returncode=0, output=""):
+    """Build a Popen stand-in whose combined output is the given text."""
+    proc = MagicMock()
+    proc.__enter__.return_value = proc
+    proc.stdout = BytesIO(output.encode())
+    proc.wait.return_value = returncode
+    return proc
 
-    def test_normalize_output_mixed_newlines(self):
-        """Should handle mixed newline styles."""
-        output = "line1\r\nline2\rline3\nline4"
-        result = normalize_output(output)
-        assert result == "line1\nline2\nline3\nline4"
+
+# Script given as bytes so build tests don't touch the filesystem
+_FAKE_SCRIPT = '/tmp/fake.py'
+_SCRIPT_BYTES = b"print('hello')"
 
 
 class TestBuildImage:
     """Tests for Docker image building."""
 
-    @patch('docker_ops.subprocess.run')
-    @patch('docker_ops.shutil.copy2')
-    def test_build_image_success(self, mock_copy, mock_run):
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_success(self, mock_popen):
         """Should return success on successful build."""
-        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        mock_popen.return_value = _fake_popen(0)
 
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-            script_path = f.name
+        success, error = build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image',
+                                     script_bytes=_SCRIPT_BYTES)
+        assert success is True
+        assert error is None
 
-        with tempfile.NamedTemporaryFile(suffix='Dockerfile', delete=False) as f:
-            dockerfile_path = f.name
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_failure(self, mock_popen):
+        """Should return error on build failure."""
+        mock_popen.return_value = _fake_popen(1, "Building...\nError: invalid Dockerfile\n")
 
-        try:
-            success, error = build_image(dockerfile_path, script_path, 'test-image')
-            assert success is True
-            assert error is None
-        finally:
-            os.unlink(script_path)
-            os.unlink(dockerfile_path)
+        success, error = build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image',
+                                     script_bytes=_SCRIPT_BYTES)
+        assert success is False
+        assert error is not None
+        assert "Error: invalid Dockerfile" in error
 
-    @patch('docker_ops.subprocess.run')
-    @patch('docker_ops.shutil.copy2')
-    def test_build_image_failure(self, mock_copy, mock_run):
-        """Should return error on build failure."""
-        mock_run.return_value = Mock(
-            returncode=1,
-            stdout="Building...",
-            stderr="Error: invalid Dockerfile"
-        )
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_timeout(self, mock_popen):
+        """Should kill the build on timeout."""
+        proc = _fake_popen()
+        proc.wait.side_effect = TimeoutExpired('docker', 120)
+        mock_popen.return_value = proc
+
+        success, error = build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image',
+                                     script_bytes=_SCRIPT_BYTES)
+        assert success is False
+        assert "timed out" in error
+        assert proc.kill.called
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_cache_from(self, mock_popen):
+        """Should enable BuildKit and only pass --cache-from when requested."""
+        mock_popen.return_value = _fake_popen(0)
+
+        build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image', script_bytes=_SCRIPT_BYTES)
+        cmd = mock_popen.call_args[0][0]
+        assert '--cache-from' not in cmd
+        assert '--pull=false' in cmd
+        assert cmd[cmd.index('--label') + 1] == 'jai-agent=1'
+        assert 'BUILDKIT_INLINE_CACHE=1' in cmd
+        assert mock_popen.call_args.kwargs['env']['DOCKER_BUILDKIT'] == '1'
+
+        mock_popen.return_value = _fake_popen(0)
+        build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image', cache_from='test-previous',
+                    script_bytes=_SCRIPT_BYTES)
+        cmd = mock_popen.call_args[0][0]
+        assert cmd[cmd.index('--cache-from') + 1] == 'test-previous'
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_pipes_tar_context(self, mock_popen, script_path):
+        """Should stream a tar of the Dockerfile and script to docker build -."""
+        proc = _fake_popen(0)
+        mock_popen.return_value = proc
+
+        build_image("FROM python:3.11", script_path, 'test-image')
+
+        assert mock_popen.call_args[0][0][-1] == '-'
+        context = proc.stdin.write.call_args[0][0]
+        with tarfile.open(fileobj=BytesIO(context)) as tar:
+            dockerfile = tar.getmember('Dockerfile')
+            script = tar.getmember(os.path.basename(script_path))
+            assert tar.extractfile(dockerfile).read() == b"FROM python:3.11"
+            assert tar.extractfile(script).read() == b"import os"
+            assert dockerfile.mtime == script.mtime == 0
+            assert script.mode == 0o755
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_uses_script_bytes(self, mock_popen):
+        """Should pack in-memory script bytes without reading the script path."""
+        proc = _fake_popen(0)
+        mock_popen.return_value = proc
+
+        build_image("FROM python:3.11", '/nonexistent/script.py', 'test-image',
+                    script_bytes=b"echo hi")
+
+        context = proc.stdin.write.call_args[0][0]
+        with tarfile.open(fileobj=BytesIO(context)) as tar:
+            assert tar.extractfile('script.py').read() == b"echo hi"
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_build_image_keeps_log_tail(self, mock_popen):
+        """Should report only the last lines of a verbose failing build."""
+        lines = [f"step {i}\n" for i in range(BUILD_LOG_TAIL_LINES + 50)]
+        mock_popen.return_value = _fake_popen(1, "".join(lines))
+
+        success, error = build_image("FROM python:3.11", _FAKE_SCRIPT, 'test-image',
+                                     script_bytes=_SCRIPT_BYTES)
+        assert success is False
+        assert "step 0\n" not in error
+        assert lines[-1] in error
+
+    def test_run_with_log_tail_times_out_when_stdin_not_read(self):
+        """The timeout should hold even if the process never reads its input."""
+        cmd = [sys.executable, '-c', 'import time; time.sleep(30)']
+        start = time.monotonic()
+        with pytest.raises(TimeoutExpired):
+            _run_with_log_tail(cmd, timeout=0.5, input_data=b"x" * (4 * 1024 * 1024))
+        assert time.monotonic() - start < 10
+
+    def test_run_with_log_tail_feeds_stdin(self):
+        """Input should be written in full and stdin closed."""
+        cmd = [sys.executable, '-c', 'import sys; print(len(sys.stdin.buffer.read()))']
+        returncode, output = _run_with_log_tail(cmd, timeout=30, input_data=b"x" * (1024 * 1024))
+        assert returncode == 0
+        assert output.strip() == str(1024 * 1024)
+
+
+class TestPrepullBaseImages:
+    """Tests for background base image pulls."""
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_prepull_base_images(self, mock_popen):
+        """Should start one background pull per image without waiting, and return them."""
+        pulls = prepull_base_images(('python:3.11-slim', 'alpine:latest'))
+
+        pulled = [c[0][0][-1] for c in mock_popen.call_args_list]
+        assert pulled == ['python:3.11-slim', 'alpine:latest']
+        assert pulls == [mock_popen.return_value] * 2
+        assert not mock_popen.return_value.wait.called
+
+    @patch('docker_ops.subprocess.Popen')
+    def test_prepull_base_images_ignores_errors(self, mock_popen):
+        """Should not raise when docker can't be started."""
+        mock_popen.side_effect = FileNotFoundError("docker")
+        assert prepull_base_images(('alpine:latest',)) == []
+
+    def test_reap_pulls(self):
+        """Should stop running pulls and wait for every one, finished or not."""
+        script = 'import time; time.sleep(30)'
+        pulls = [Popen([sys.executable, '-c', script]), Popen([sys.executable, '-c', ''])]
+        pulls[1].wait()
+
+        start = time.monotonic()
+        reap_pulls(pulls)
+
+        assert time.monotonic() - start < 10
+        assert all(p.returncode is not None for p in pulls)
+        assert pulls[0].returncode != 0
+        assert pulls[1].returncode == 0
+
+
+class TestImageCleanup:
+    """Tests for batched image removal and pruning."""
 
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-            script_path = f.name
+    @patch('docker_ops.subprocess.run')
+    def test_remove_images_single_call(self, mock_run):
+        """Should remove all images with one docker rmi."""
+        remove_images(['test-a', 'test-b'])
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == [_DOCKER, 'rmi', '-f', 'test-a', 'test-b']
 
-        with tempfile.NamedTemporaryFile(suffix='Dockerfile', delete=False) as f:
-            dockerfile_path = f.name
+        remove_images([])
+        assert mock_run.call_count == 1
 
-        try:
-            success, error = build_image(dockerfile_path, script_path, 'test-image')
-            assert success is False
-            assert error is not None
-            assert "Error: invalid Dockerfile" in error
-        finally:
-            os.unlink(script_path)
-            os.unlink(dockerfile_path)
+    @patch('docker_ops.subprocess.run')
+    def test_prune_dangling_images(self, mock_run):
+        """Should prune only dangling images carrying the jai label."""
+        prune_dangling_images()
+        cmd = mock_run.call_args[0][0]
+        assert cmd == [_DOCKER, 'image', 'prune', '-f', '--filter', 'label=jai-agent=1']
 
     @patch('docker_ops.subprocess.run')
-    @patch('docker_ops.shutil.copy2')
-    def test_build_image_timeout(self, mock_copy, mock_run):
-        """Should handle build timeout."""
-        mock_run.side_effect = __import__('subprocess').TimeoutExpired('docker', 120)
+    def test_prune_images_over_threshold(self, mock_run):
+        """Should prune dangling labeled images only when labeled images exceed the threshold."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stdout="6.5GB\n4GB\n512MB\n")
 
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-            script_path = f.name
+        assert prune_images_if_needed(10 * 1000 ** 3) is True
+        usage_cmd = mock_run.call_args_list[0][0][0]
+        assert usage_cmd[:2] == [_DOCKER, 'images']
+        assert 'label=jai-agent=1' in usage_cmd
+        prune_cmd = mock_run.call_args[0][0]
+        assert prune_cmd == [_DOCKER, 'image', 'prune', '-f', '--filter', 'label=jai-agent=1']
 
-        with tempfile.NamedTemporaryFile(suffix='Dockerfile', delete=False) as f:
-            dockerfile_path = f.name
+    @patch('docker_ops.subprocess.run')
+    def test_prune_images_under_threshold(self, mock_run):
+        """Should not prune below the threshold."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stdout="512.3MB\n1.2GB\n")
 
-        try:
-            success, error = build_image(dockerfile_path, script_path, 'test-image')
-            assert success is False
-            assert "timed out" in error
-        finally:
-            os.unlink(script_path)
-            os.unlink(dockerfile_path)
+        assert prune_images_if_needed(10 * 1024 ** 3) is False
+        assert mock_run.call_count == 1
 
 
 class TestRunContainer:
@@ -139,7 +303,7 @@ class TestRunContainer:
     @patch('docker_ops.subprocess.run')
     def test_run_container_success(self, mock_run):
         """Should return success on successful run."""
-        mock_run.return_value = Mock(
+        mock_run.return_value = SimpleNamespace(
             returncode=0,
             stdout="Hello World",
             stderr=""
@@ -153,7 +317,7 @@ class TestRunContainer:
     @patch('docker_ops.subprocess.run')
     def test_run_container_failure(self, mock_run):
         """Should return error on container failure."""
-        mock_run.return_value = Mock(
+        mock_run.return_value = SimpleNamespace(
             returncode=1,
             stdout="",
             stderr="Error in script"
@@ -167,16 +331,21 @@ class TestRunContainer:
     @patch('docker_ops.subprocess.run')
     def test_run_container_timeout(self, mock_run):
         """Should handle container timeout."""
-        mock_run.side_effect = __import__('subprocess').TimeoutExpired('docker', 30)
+        mock_run.side_effect = TimeoutExpired('docker', 30)
 
         success, output, error = run_container('test-image', 'input data')
         assert success is False
         assert "timed out" in error
 
+        # The named container is killed rather than left running
+        run_cmd = mock_run.call_args_list[0][0][0]
+        container_name = run_cmd[run_cmd.index('--name') + 1]
+        assert mock_run.call_args_list[1][0][0] == [_DOCKER, 'kill', container_name]
+
     @patch('docker_ops.subprocess.run')
     def test_run_container_resource_limits(self, mock_run):
         """Should apply resource limits in docker run command."""
-        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        mock_run.return_value = _OK
 
         run_container('test-image', 'input')
 
@@ -188,124 +357,144 @@ class TestRunContainer:
         assert '--pids-limit=100' in cmd
 
 
-class TestTestDockerfile:
-    """Tests for Dockerfile testing."""
-
-    @patch('docker_ops.check_docker_available')
-    def test_test_dockerfile_docker_unavailable(self, mock_check):
-        """Should fail if Docker is not available."""
-        mock_check.return_value = False
+class TestBuildImageAsync:
+    """Tests for the async image build."""
 
-        result = test_dockerfile(
-            dockerfile_path='Dockerfile',
-            script_path='script.py',
-            example_input='input',
-            expected_output='output'
+    def test_run_with_log_tail_async_keeps_tail(self):
+        """Only the last lines of the output should be kept, with input fed in full."""
+        script = (
+            'import sys; n = len(sys.stdin.buffer.read()); '
+            'print("x" * 200000); [print(i) for i in range(500)]; print(n, end="")'
         )
+        returncode, output = asyncio.run(_run_with_log_tail_async(
+            [sys.executable, '-c', script], timeout=30, input_data=b"y" * (1024 * 1024)
+        ))
+        assert returncode == 0
+        lines = output.splitlines()
+        assert len(lines) == BUILD_LOG_TAIL_LINES
+        assert lines[-1] == str(1024 * 1024)
+        assert "x" * 100 not in output
+
+    def test_run_with_log_tail_async_times_out(self):
+        """The timeout should hold even if the process never reads its input."""
+        cmd = [sys.executable, '-c', 'import time; time.sleep(30)']
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(_run_with_log_tail_async(cmd, timeout=0.5, input_data=b"x" * (4 * 1024 * 1024)))
+        assert time.monotonic() - start < 10
+
+    @patch('docker_ops._run_with_log_tail_async')
+    def test_build_image_async_cache_from(self, mock_run):
+        """Should pass --cache-from and report the output tail on failure."""
+        async def fake_run(cmd, **kwargs):
+            return 1, "step 9\n"
+        mock_run.side_effect = fake_run
+
+        success, error = asyncio.run(build_image_async(
+            "FROM python:3.11", _FAKE_SCRIPT, 'test-image', cache_from='test-previous',
+            script_bytes=_SCRIPT_BYTES
+        ))
+        assert success is False
+        assert "step 9" in error
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index('--cache-from') + 1] == 'test-previous'
 
-        assert result.success is False
-        assert "Docker daemon" in result.build_errors
 
-    @patch('docker_ops.check_docker_available')
-    @patch('docker_ops.build_image')
-    def test_test_dockerfile_build_failure(self, mock_build, mock_check):
-        """Should fail if build fails."""
-        mock_check.return_value = True
-        mock_build.return_value = (False, "Build error")
+class TestRunContainerAsync:
+    """Tests for the async container runner."""
 
-        result = test_dockerfile(
-            dockerfile_path='Dockerfile',
-            script_path='script.py',
-            example_input='input',
-            expected_output='output'
-        )
+    @patch('docker_ops._communicate_async')
+    def test_run_container_async_success(self, mock_communicate):
+        """Should return output when the container succeeds."""
+        mock_communicate.return_value = (0, "Hello World\n", "")
 
-        assert result.success is False
-        assert result.build_errors == "Build error"
-
-    @patch('docker_ops.check_docker_available')
-    @patch('docker_ops.build_image')
-    @patch('docker_ops.run_container')
-    @patch('docker_ops._cleanup_image')
-    def test_test_dockerfile_run_failure(self, mock_cleanup, mock_run, mock_build, mock_check):
-        """Should fail if container run fails."""
-        mock_check.return_value = True
-        mock_build.return_value = (True, None)
-        mock_run.return_value = (False, None, "Runtime error")
+        success, output, error = asyncio.run(run_container_async('test-image', 'input data'))
+        assert success is True
+        assert output == "Hello World"
+        assert error is None
+        assert '--network=none' in mock_communicate.call_args[0][0]
 
-        result = test_dockerfile(
-            dockerfile_path='Dockerfile',
-            script_path='script.py',
-            example_input='input',
-            expected_output='output'
-        )
+    @patch('docker_ops._kill_container')
+    @patch('docker_ops._communicate_async')
+    def test_run_container_async_timeout(self, mock_communicate, mock_kill):
+        """Should report a timeout and kill the container."""
+        mock_communicate.side_effect = asyncio.TimeoutError()
 
-        assert result.success is False
-        assert result.runtime_errors == "Runtime error"
-        assert mock_cleanup.called
-
-    @patch('docker_ops.check_docker_available')
-    @patch('docker_ops.build_image')
-    @patch('docker_ops.run_container')
-    @patch('docker_ops._cleanup_image')
-    def test_test_dockerfile_output_mismatch(self, mock_cleanup, mock_run, mock_build, mock_check):
-        """Should fail if output doesn't match."""
-        mock_check.return_value = True
-        mock_build.return_value = (True, None)
-        mock_run.return_value = (True, "actual output", None)
+        success, output, error = asyncio.run(run_container_async('test-image', 'input data'))
+        assert success is False
+        assert "timed out" in error
+        cmd = mock_communicate.call_args[0][0]
+        mock_kill.assert_called_once_with(cmd[cmd.index('--name') + 1])
+
+
+@pytest.fixture
+def docker_steps(monkeypatch):
+    """Mock the Docker check, build, run and cleanup steps of test_dockerfile."""
+    steps = SimpleNamespace(
+        check=Mock(return_value=True),
+        build=Mock(return_value=(True, None)),
+        run=Mock(return_value=(True, "expected output", None)),
+        cleanup=Mock(),
+    )
+    monkeypatch.setattr('docker_ops.check_docker_available', steps.check)
+    monkeypatch.setattr('docker_ops.build_image', steps.build)
+    monkeypatch.setattr('docker_ops.run_container', steps.run)
+    monkeypatch.setattr('docker_ops._cleanup_image', steps.cleanup)
+    return steps
 
-        result = test_dockerfile(
-            dockerfile_path='Dockerfile',
-            script_path='script.py',
-            example_input='input',
-            expected_output='expected output'
-        )
 
-        assert result.success is False
-        assert result.output_diff is not None
-        assert "expected output" in result.output_diff
-        assert "actual output" in result.output_diff
-        assert mock_cleanup.called
-
-    @patch('docker_ops.check_docker_available')
-    @patch('docker_ops.build_image')
-    @patch('docker_ops.run_container')
-    @patch('docker_ops._cleanup_image')
-    def test_test_dockerfile_success(self, mock_cleanup, mock_run, mock_build, mock_check):
-        """Should succeed when output matches."""
-        mock_check.return_value = True
-        mock_build.return_value = (True, None)
-        mock_run.return_value = (True, "expected output", None)
+class TestTestDockerfile:
+    """Tests for Dockerfile testing."""
+
+    @pytest.mark.parametrize(
+        "docker_ok,build_ret,run_ret,success,field,substrings,cleaned",
+        [
+            (False, None, None, False, 'build_errors', ["Docker daemon"], False),
+            (True, (False, "Build error"), None, False, 'build_errors', ["Build error"], False),
+            (True, (True, None), (False, None, "Runtime error"), False,
+             'runtime_errors', ["Runtime error"], True),
+            (True, (True, None), (True, "actual output", None), False,
+             'output_diff', ["expected output", "actual output"], True),
+            (True, (True, None), (True, "expected output", None), True, None, [], True),
+            # Extra whitespace and CRLF are normalized before comparison
+            (True, (True, None), (True, "expected output\r\n  ", None), True, None, [], True),
+        ],
+        ids=["docker_unavailable", "build_failure", "run_failure", "output_mismatch",
+             "success", "normalizes_output"],
+    )
+    def test_test_dockerfile(self, docker_steps, docker_ok, build_ret, run_ret,
+                             success, field, substrings, cleaned):
+        """Should report the first failing step, and clean up images it built."""
+        docker_steps.check.return_value = docker_ok
+        docker_steps.build.return_value = build_ret
+        docker_steps.run.return_value = run_ret
 
         result = test_dockerfile(
-            dockerfile_path='Dockerfile',
+            dockerfile_content='FROM python:3.11',
             script_path='script.py',
             example_input='input',
             expected_output='expected output'
         )
 
-        assert result.success is True
-        assert mock_cleanup.called
-
-    @patch('docker_ops.check_docker_available')
-    @patch('docker_ops.build_image')
-    @patch('docker_ops.run_container')
-    @patch('docker_ops._cleanup_image')
-    def test_test_dockerfile_normalizes_output(self, mock_cleanup, mock_run, mock_build, mock_check):
-        """Should normalize output before comparison."""
-        mock_check.return_value = True
-        mock_build.return_value = (True, None)
-        # Note the extra whitespace and CRLF
-        mock_run.return_value = (True, "expected output\r\n  ", None)
+        assert result.success is success
+        if field:
+            value = getattr(result, field)
+            assert all(sub in value for sub in substrings)
+        assert docker_steps.cleanup.called is cleaned
 
+    def test_test_dockerfile_keeps_caller_image(self, docker_steps):
+        """Should build the given image name and leave it for the caller to remove."""
         result = test_dockerfile(
-            dockerfile_path='Dockerfile',
+            dockerfile_content='FROM python:3.11',
             script_path='script.py',
             example_input='input',
-            expected_output='expected output'
+            expected_output='expected output',
+            image_name='test-stable',
         )
 
         assert result.success is True
+        assert docker_steps.build.call_args[0][2] == 'test-stable'
+        assert not docker_steps.cleanup.called
 
 
 class TestTestResult:
@@ -327,3 +516,15 @@ class TestTestResult:
         assert result.success is False
         assert result.build_errors == "Build failed"
         assert result.runtime_errors == "Runtime error"
+
+
+class TestUniqueName:
+    """Tests for generated image/container names."""
+
+    def test_unique_name_format(self):
+        """Should be the prefix plus 8 hex characters, different each call."""
+        name = _unique_name('test')
+        assert name.startswith('test-')
+        assert len(name) == len('test-') + 8
+        int(name[5:], 16)
+        assert _unique_name('test') != name
@@ -1,66 +1,69 @@
 """Tests for file_handler module."""
 
 import os
-import tempfile
+import re
 import pytest
+from unittest.mock import patch
 
-from file_handler import FileReader
+from file_handler import (
+    FileReader, _compile, _decode_block, _matching_lines, _required_literal, _split_lines,
+)
 
 
 class TestFileReader:
     """Tests for FileReader class."""
 
-    def test_file_reader_small_file(self):
+    def test_file_reader_small_file(self, make_file):
         """Small file should load content immediately."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("import numpy\nprint('hello')")
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=1000)
-                assert reader.is_large is False
-                assert reader.content is not None
-                assert "import numpy" in reader.content
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_large_file_threshold(self):
+        path = make_file("import numpy\nprint('hello')")
+        reader = FileReader(path, threshold=1000)
+        assert reader.is_large is False
+        assert reader.content is not None
+        assert "import numpy" in reader.content
+
+    def test_file_reader_large_file_threshold(self, make_file):
         """File exceeding threshold should not load content."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-            # Create file larger than threshold
-            f.write("x" * 200)
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=100)
-                assert reader.is_large is True
-                assert reader.content is None
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_get_content_small_file(self):
+        # Create file larger than threshold
+        path = make_file("x" * 200, suffix='.js')
+        reader = FileReader(path, threshold=100)
+        assert reader.is_large is True
+        assert reader.content is None
+
+    def test_file_reader_from_stat(self, make_file):
+        """from_stat should use the given stat result instead of stat-ing again."""
+        path = make_file("print('hello')\n")
+        st = os.stat(path)
+        with patch('file_handler.Path.stat') as mock_stat:
+            reader = FileReader.from_stat(path, st, threshold=1000)
+            assert not mock_stat.called
+        assert reader.size == st.st_size
+        assert reader.content == "print('hello')\n"
+
+    def test_file_reader_from_direntry(self, make_file):
+        """from_direntry should use the scandir entry's stat result."""
+        path = make_file("print('hello')\n")
+        entry, = [e for e in os.scandir(os.path.dirname(path)) if e.path == path]
+        with patch('file_handler.Path.stat') as mock_stat:
+            reader = FileReader.from_direntry(entry, threshold=1000)
+            assert not mock_stat.called
+        assert reader.file_path == path
+        assert reader.content == "print('hello')\n"
+
+    def test_file_reader_get_content_small_file(self, make_file):
         """get_content() should return content for small files."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False) as f:
-            f.write("#!/bin/bash\necho hello")
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=1000)
-                content = reader.get_content()
-                assert "echo hello" in content
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_get_content_large_file_fails(self):
+        path = make_file("#!/bin/bash\necho hello", suffix='.sh')
+        reader = FileReader(path, threshold=1000)
+        content = reader.get_content()
+        assert "echo hello" in content
+
+    def test_file_reader_get_content_large_file_fails(self, make_file):
         """get_content() should raise error for large files."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("x" * 200)
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=100)
-                with pytest.raises(ValueError, match="too large"):
-                    reader.get_content()
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_search_in_file(self):
+        path = make_file("x" * 200)
+        reader = FileReader(path, threshold=100)
+        with pytest.raises(ValueError, match="too large"):
+            reader.get_content()
+
+    def test_file_reader_search_in_file(self, make_file):
         """search_in_file should find matching lines."""
         content = """def hello():
     print('hello')
@@ -68,85 +71,294 @@ class TestFileReader:
 def world():
     print('world')
 """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(content)
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=10000)
-                matches = reader.search_in_file(r"^def ")
-                assert len(matches) == 2
-                assert matches[0]['line_num'] == 1
-                assert matches[0]['content'] == "def hello():"
-                assert matches[1]['line_num'] == 4
-                assert matches[1]['content'] == "def world():"
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_search_with_context(self):
+        path = make_file(content)
+        reader = FileReader(path, threshold=10000)
+        matches = reader.search_in_file(r"^def ")
+        assert len(matches) == 2
+        assert matches[0]['line_num'] == 1
+        assert matches[0]['content'] == "def hello():"
+        assert matches[1]['line_num'] == 4
+        assert matches[1]['content'] == "def world():"
+
+    def test_file_reader_search_with_context(self, make_file):
         """search_in_file should include context lines."""
         content = """line1
 import numpy as np
 line3
 """
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(content)
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=10000)
-                matches = reader.search_in_file(r"import", context_lines=1)
-                assert len(matches) == 1
-                assert matches[0]['line_num'] == 2
-                assert len(matches[0]['context_before']) > 0
-                assert len(matches[0]['context_after']) > 0
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_search_no_matches(self):
+        path = make_file(content)
+        reader = FileReader(path, threshold=10000)
+        matches = reader.search_in_file(r"import", context_lines=1)
+        assert len(matches) == 1
+        assert matches[0]['line_num'] == 2
+        assert len(matches[0]['context_before']) > 0
+        assert len(matches[0]['context_after']) > 0
+
+    def test_file_reader_search_no_matches(self, make_file):
         """search_in_file should return empty list when no matches."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("print('hello')")
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=10000)
-                matches = reader.search_in_file(r"^import ")
-                assert matches == []
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_search_invalid_regex(self):
+        path = make_file("print('hello')")
+        reader = FileReader(path, threshold=10000)
+        matches = reader.search_in_file(r"^import ")
+        assert matches == []
+
+    def test_file_reader_search_invalid_regex(self, make_file):
         """search_in_file should handle invalid regex."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write("test")
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=10000)
-                with pytest.raises(ValueError, match="Invalid regex"):
-                    reader.search_in_file(r"[invalid(")
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_line_count_small_file(self):
+        path = make_file("test")
+        reader = FileReader(path, threshold=10000)
+        with pytest.raises(ValueError, match="Invalid regex"):
+            reader.search_in_file(r"[invalid(")
+
+    def test_file_reader_search_across_blocks(self, make_file, monkeypatch):
+        """Matches and context should be right when lines span several read blocks."""
+        monkeypatch.setattr('file_handler._SEARCH_BLOCK', 16)
+        content = "".join(f"line {i}\n" for i in range(40)) + "import os"
+        path = make_file(content)
+        reader = FileReader(path, threshold=100)
+        matches = reader.search_in_file(r"^line 1[05]$|^import", context_lines=2)
+        assert [m['line_num'] for m in matches] == [11, 16, 41]
+        assert matches[0]['context_before'] == ["line 8", "line 9"]
+        assert matches[0]['context_after'] == ["line 11", "line 12"]
+        assert matches[2]['content'] == "import os"
+        assert matches[2]['context_after'] == []
+
+    def test_file_reader_search_stops_reading_after_limit(self, make_file, monkeypatch):
+        """Past 50 matches only enough to fill the last context should be read."""
+        monkeypatch.setattr('file_handler._SEARCH_BLOCK', 100)
+        monkeypatch.setattr('file_handler._TAIL_BLOCK', 10)
+        content = "import os\n" * 50 + "line\n" * 1000
+        path = make_file(content)
+        reader = FileReader(path, threshold=100)
+        with patch('file_handler._decode_block', wraps=_decode_block) as mock_decode:
+            matches = reader.search_in_file(r"^import", context_lines=2)
+        assert len(matches) == 50
+        assert matches[-1]['context_after'] == ["line", "line"]
+        assert sum(len(c.args[0]) for c in mock_decode.call_args_list) <= 500 + 10
+
+    def test_file_reader_search_without_mmap(self, make_file, monkeypatch):
+        """search_in_file should fall back to plain reads when mmap fails."""
+        monkeypatch.setattr('file_handler._SEARCH_BLOCK', 16)
+        content = "".join(f"line {i}\n" for i in range(40)) + "import os"
+        path = make_file(content)
+        reader = FileReader(path, threshold=100)
+        expected = reader.search_in_file(r"^line 1[05]$|^import", context_lines=2)
+        with patch('file_handler.mmap.mmap', side_effect=OSError("no mmap")):
+            matches = reader.search_in_file(r"^line 1[05]$|^import", context_lines=2)
+        assert [m['line_num'] for m in matches] == [11, 16, 41]
+        assert matches == expected
+
+    def test_file_reader_search_small_file_in_memory(self, make_file):
+        """Small files should be searched from memory, split into lines only once."""
+        path = make_file("import os\nx = 1\nimport sys\n")
+        reader = FileReader(path, threshold=1000)
+        with patch('file_handler.mmap.mmap') as mock_mmap, \
+                patch('file_handler._split_lines', wraps=_split_lines) as mock_split:
+            first = reader.search_in_file(r"^import", context_lines=1)
+            second = reader.search_in_file_batch([r"^import"], context_lines=1)[r"^import"]
+        assert [m['line_num'] for m in first] == [1, 3]
+        assert first[0]['context_after'] == ["x = 1"]
+        assert second == first
+        assert not mock_mmap.called
+        assert mock_split.call_count == 1
+
+    def test_file_reader_search_iter(self, make_file, monkeypatch):
+        """search_in_file_iter should yield every match lazily, past the list limit."""
+        monkeypatch.setattr('file_handler._SEARCH_BLOCK', 64)
+        content = "import os\nx = 1\n" * 100
+        path = make_file(content)
+        reader = FileReader(path, threshold=100)
+        with patch('file_handler._decode_block', wraps=_decode_block) as mock_decode:
+            matches = reader.search_in_file_iter(r"^import", context_lines=1)
+            first = next(matches)
+            assert first['context_after'] == ["x = 1"]
+            assert mock_decode.call_count == 1
+        assert 1 + len(list(matches)) == 100
+        assert len(reader.search_in_file(r"^import")) == 50
+
+    def test_file_reader_search_iter_invalid_regex(self, make_file):
+        """search_in_file_iter should reject an invalid pattern before iterating."""
+        path = make_file("test")
+        reader = FileReader(path, threshold=10000)
+        with pytest.raises(ValueError, match="Invalid regex"):
+            reader.search_in_file_iter(r"[invalid(")
+
+    def test_file_reader_search_match_spanning_lines(self, make_file):
+        """A match spanning lines should not hide a match on the following line."""
+        path = make_file("a\nb a b\n")
+        reader = FileReader(path, threshold=10000)
+        matches = reader.search_in_file(r"a\s+b", context_lines=0)
+        assert [m['line_num'] for m in matches] == [2]
+
+    def test_file_reader_search_reuses_compiled_regex(self, make_file):
+        """Repeated searches for a pattern should hit the compile cache."""
+        path = make_file("import os\n")
+        reader = FileReader(path, threshold=10000)
+        reader.search_in_file(r"^import cached")
+        hits = _compile.cache_info().hits
+        reader.search_in_file(r"^import cached")
+        assert _compile.cache_info().hits == hits + 1
+
+    def test_required_literal(self):
+        """The prefilter literal should be text every match must contain."""
+        assert _required_literal(r"^import ") == "import "
+        assert _required_literal(r"^\s*import\s+numpy") == "import"
+        assert _required_literal(r"foo\.bar") == "foo.bar"
+        assert _required_literal(r"import|from") is None
+        assert _required_literal(r"(?i)import") is None
+
+    def test_file_reader_search_skips_blocks_without_literal(self, make_file, monkeypatch):
+        """Blocks lacking the pattern's literal text should not be regex-searched."""
+        monkeypatch.setattr('file_handler._SEARCH_BLOCK', 16)
+        content = "x = 1\n" * 20 + "import os\n"
+        path = make_file(content)
+        reader = FileReader(path, threshold=100)
+        with patch('file_handler._matching_lines', wraps=_matching_lines) as mock_lines:
+            matches = reader.search_in_file(r"^import ", context_lines=0)
+        assert [m['line_num'] for m in matches] == [21]
+        assert mock_lines.call_count == 1
+
+    def test_matching_lines_trusts_matches_within_a_line(self):
+        """A block match inside one line should only be re-tested when lookarounds may differ."""
+        class CountingRegex:
+            def __init__(self, pattern):
+                self.regex = re.compile(pattern, re.MULTILINE)
+                self.calls = 0
+
+            def search(self, *args):
+                self.calls += 1
+                return self.regex.search(*args)
+
+        text = "a b\nb\nx a\n"
+        lines = ["a b", "b", "x a"]
+        plain = CountingRegex(r"a")
+        assert list(_matching_lines(plain, text, lines, True, False, lookaround=False)) == [0, 2]
+        assert plain.calls == 2  # Block searches only
+        ahead = CountingRegex(r"a(?=\nb)")
+        assert list(_matching_lines(ahead, text, lines, True, False, lookaround=True)) == []
+        spanning = CountingRegex(r"a\s+b")
+        assert list(_matching_lines(spanning, "a\nb", ["a", "b"], False, False, lookaround=False)) == []
+
+    def test_file_reader_search_batch(self, make_file):
+        """search_in_file_batch should return matches per pattern from one scan."""
+        content = "import os\nimport sys\n\ndef main():\n    os.system('apt-get install x')\n"
+        path = make_file(content)
+        reader = FileReader(path, threshold=10000)
+        results = reader.search_in_file_batch(
+            [r"^import ", r"apt-get", r"def main", r"^func main"], context_lines=0
+        )
+        assert [m['line_num'] for m in results[r"^import "]] == [1, 2]
+        assert results[r"apt-get"][0]['line_num'] == 5
+        assert results[r"def main"][0]['content'] == "def main():"
+        assert results[r"^func main"] == []
+        assert results[r"^import "] == reader.search_in_file(r"^import ", context_lines=0)
+
+    def test_file_reader_search_batch_backreferences(self, make_file):
+        """Backreferences should keep pointing at each pattern's own groups."""
+        path = make_file("aa\nbb\ncc\n")
+        reader = FileReader(path, threshold=10000)
+        patterns = [r"(a)\1", r"(b)\1", r"(?P<c>c)(?P=c)"]
+        results = reader.search_in_file_batch(patterns, context_lines=0)
+        for pattern in patterns:
+            assert results[pattern] == reader.search_in_file(pattern, context_lines=0)
+        assert [m['line_num'] for m in results[r"(b)\1"]] == [2]
+
+    def test_file_reader_search_batch_invalid_regex(self, make_file):
+        """search_in_file_batch should reject an invalid pattern."""
+        path = make_file("test")
+        reader = FileReader(path, threshold=10000)
+        with pytest.raises(ValueError, match="Invalid regex"):
+            reader.search_in_file_batch([r"test", r"[invalid("])
+
+    def test_file_reader_line_count_small_file(self, make_file):
         """line_count should be accurate for small files."""
         content = "line1\nline2\nline3\n"
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(content)
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=1000)
-                assert reader.line_count == 3
-            finally:
-                os.unlink(f.name)
-
-    def test_file_reader_line_count_large_file(self):
+        path = make_file(content)
+        reader = FileReader(path, threshold=1000)
+        assert reader.line_count == 3
+
+    def test_file_reader_line_count_mixed_newlines(self, make_file):
+        """line_count should treat CRLF and lone CR as line endings."""
+        path = make_file(b"a\r\nb\rc\nd")
+        reader = FileReader(path, threshold=1000)
+        assert reader.line_count == 4
+        assert reader.content == "a\nb\nc\nd"
+
+    def test_file_reader_line_count_large_file(self, make_file):
         """line_count should work for large files too."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            # Write 200 lines
-            for i in range(200):
-                f.write(f"line {i}\n")
-            f.flush()
-            try:
-                reader = FileReader(f.name, threshold=100)  # Small threshold to make it large
-                assert reader.line_count == 200
-            finally:
-                os.unlink(f.name)
+        # Write 200 lines
+        path = make_file("".join(f"line {i}\n" for i in range(200)))
+        reader = FileReader(path, threshold=100)  # Small threshold to make it large
+        assert reader.line_count == 200
+
+    def test_file_reader_line_count_large_file_no_trailing_newline(self, make_file):
+        """A large file's last line should count even without a newline."""
+        path = make_file("\n".join(f"line {i}" for i in range(200)))
+        reader = FileReader(path, threshold=100)
+        assert reader.is_large
+        assert reader.line_count == 200
+
+    def test_file_reader_large_by_line_count(self, make_file):
+        """A file small in bytes but over the line threshold should be large."""
+        path = make_file("x\n" * 50)
+        reader = FileReader(path, threshold=1000, threshold_lines=10)
+        assert reader.is_large
+        assert reader.content is None
+        assert reader.line_count == 50
+        # Still in memory, so it can be scanned for prompt injection
+        assert reader.content_text == "x\n" * 50
+
+    def test_file_reader_large_file_counts_lines_lazily(self, make_file):
+        """Large files should only be scanned for line_count when it is read."""
+        path = make_file("line\n" * 200)
+        with patch.object(FileReader, '_count_lines_mmap', return_value=200) as mock_count:
+            reader = FileReader(path, threshold=100)
+            assert not mock_count.called
+            assert reader.line_count == 200
+            assert reader.line_count == 200
+            assert mock_count.call_count == 1
+
+    def test_file_reader_reads_small_file_lazily(self, make_file):
+        """Construction should only stat; the content is read once, when first needed."""
+        path = make_file("print('hello')\n")
+        with patch('file_handler.Path.read_bytes', autospec=True,
+                   side_effect=lambda p: open(p, 'rb').read()) as mock_read:
+            reader = FileReader(path, threshold=1000)
+            assert reader.size == 15
+            assert not mock_read.called
+            assert reader.line_count == 1
+            assert reader.content == "print('hello')\n"
+            assert reader.content_bytes == b"print('hello')\n"
+            assert mock_read.call_count == 1
+
+    def test_file_reader_line_count_skips_decode(self, make_file):
+        """line_count and is_large should count raw bytes without decoding the file."""
+        path = make_file(b"a\r\nb\rc\n\xff")
+        reader = FileReader(path, threshold=1000)
+        assert reader.line_count == 4
+        assert reader.is_large is False
+        assert '_text' not in vars(reader)
+        with pytest.raises(IOError, match="Failed to read"):
+            reader.content
+
+    def test_file_reader_line_count_without_mmap(self, make_file):
+        """line_count should fall back to buffered reads when mmap fails."""
+        path = make_file("line\n" * 199 + "last")
+        reader = FileReader(path, threshold=100)
+        with patch('file_handler.mmap.mmap', side_effect=OSError("no mmap")):
+            assert reader.line_count == 200
+
+    def test_file_reader_content_bytes_cached(self, make_file):
+        """Small files should keep their raw bytes alongside the decoded text."""
+        path = make_file(b"print('hi')\r\n")
+        reader = FileReader(path, threshold=1000)
+        assert reader.content_bytes == b"print('hi')\r\n"
+        assert reader.content_bytes is reader.content_bytes
+        assert reader.content_text == "print('hi')\n"
 
+    def test_file_reader_content_view(self, make_file):
+        """content_view should expose the cached bytes without copying them."""
+        path = make_file(b"print('hi')\n")
+        reader = FileReader(path, threshold=1000)
+        view = reader.content_view
+        assert view.readonly
+        assert view.obj is reader.content_bytes
+        assert b"hi" in view.tobytes()
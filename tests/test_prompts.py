@@ -0,0 +1,54 @@
+"""Tests for prompts module."""
+
+from prompts import build_system_prompt, extract_dockerfile
+
+
+class TestExtractDockerfile:
+    """Tests for Dockerfile extraction from LLM responses."""
+
+    def test_extract_dockerfile_code_block(self):
+        """Should return the content of a fenced block, without the language tag."""
+        response = "Here you go:\n```dockerfile\nFROM python:3.11\nCMD [\"python\"]\n```\nDone."
+        assert extract_dockerfile(response) == "FROM python:3.11\nCMD [\"python\"]"
+
+    def test_extract_dockerfile_first_block_only(self):
+        """Should stop at the first closing marker."""
+        response = "```\nFROM alpine\n```\n```\nFROM debian\n```"
+        assert extract_dockerfile(response) == "FROM alpine"
+
+    def test_extract_dockerfile_unclosed_block(self):
+        """An unclosed block should run to the end of the response."""
+        response = "```dockerfile\nFROM alpine\nRUN apk add bash\n"
+        assert extract_dockerfile(response) == "FROM alpine\nRUN apk add bash"
+
+    def test_extract_dockerfile_indented_markers(self):
+        """Markers indented with whitespace should still be recognised."""
+        response = "  ```dockerfile\nFROM alpine\n  ```"
+        assert extract_dockerfile(response) == "FROM alpine"
+
+    def test_extract_dockerfile_no_block(self):
+        """Plain text without code blocks should be returned unchanged."""
+        response = "FROM alpine\nCMD [\"sh\"]"
+        assert extract_dockerfile(response) == response
+
+    def test_extract_dockerfile_non_string(self):
+        """Non-string input should be returned as is."""
+        assert extract_dockerfile(None) is None
+
+
+class TestBuildSystemPrompt:
+    """Tests for system prompt selection."""
+
+    def test_build_system_prompt_variants(self):
+        """Each flag should add its own instructions."""
+        prompt = build_system_prompt(use_search_tool=True, docker_available=True)
+        assert "search_in_file" in prompt
+        assert "test_dockerfile" in prompt
+
+        prompt = build_system_prompt(use_search_tool=False, docker_available=False)
+        assert "search_in_file" not in prompt
+        assert "Testing will not be possible" in prompt
+
+    def test_build_system_prompt_reused(self):
+        """The same flags should return the same precomputed prompt."""
+        assert build_system_prompt(True, False) is build_system_prompt(True, False, "openai")